@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+import pandas as pd
+from CLI import expand_input_paths, scripts_directory, EXIT_SUCCESS, EXIT_USAGE
+from Profiler import RunProfiler, get_process_peak_memory_mb
+from Logger import Logger
+from Synthetic import generate_exports
+from Utils import combine_dataframes, move_files_info_to_template
+from Summary import get_summary_sheets
+from Template import get_template, get_template_metadata
+from Headless import create_dashboard_report_headless
+from Custom import (load_files, assign_sites, parse_descriptions, clean_not_candidates, insert_ageing_values, insert_label_values,
+                    create_dashboard_report, create_dashboard_report_batched, create_financial_report, template_path, new_file_name)
+
+# History of the results, one JSON line per benchmark run
+results_path = '../Benchmarks/results.jsonl'
+dashboard_writers = {'xlwings': create_dashboard_report, 'batched': create_dashboard_report_batched, 'headless': create_dashboard_report_headless}
+# Change of the best wall time against the previous run with the same parameters that is reported as a regression
+regression_threshold = 0.10
+
+def run_stages(file_paths: list, options: dict, output_dir: str, profiler: RunProfiler):
+    """Run every stage of the reports once, the variants of a stage are measured as 'stage[variant]'."""
+    logger_path = os.path.join(output_dir, 'result.log')
+    reports_dir = os.path.join(output_dir, 'Report History')
+    lattest_report_dir = os.path.join(output_dir, 'Lattest Report')
+    for folder in (reports_dir, os.path.join(lattest_report_dir, 'Dashboard'), os.path.join(lattest_report_dir, 'Financial')):
+        os.makedirs(folder, exist_ok=True)
+
+    with profiler.stage('read_files'):
+        boards_data_frames, sites_dict, financial_data_frame = load_files(file_paths)
+    profiler.add_rows('read_files', sum(len(data_frame) for data_frame in boards_data_frames))
+
+    with profiler.stage('prepare_template'):
+        template = get_template()
+        template = move_files_info_to_template(combine_dataframes(boards_data_frames), template)
+        template = assign_sites(template, sites_dict)
+    profiler.add_rows('prepare_template', len(template))
+
+    logger = Logger(log_path=logger_path, formats=[])
+    with profiler.stage('parse_descriptions'):
+        descriptions = parse_descriptions(template, logger)
+    profiler.add_rows('parse_descriptions', len(template))
+
+    tasks_to_be_ignored = logger.get_tasks_ids()
+    clean_not_candidates(template, tasks_to_be_ignored)
+    ageing_candidates = descriptions.select([not logger.is_flagged(task_id) for task_id in descriptions.task_ids])
+
+    tasks_by_ageing_output = {}
+    for ageing_output in options['ageing_outputs']:
+        tasks = template.copy()
+        stage = f"insert_ageing_values[{ageing_output}]"
+        with profiler.stage(stage):
+            insert_ageing_values(ageing_candidates, tasks, ageing_output)
+        profiler.add_rows(stage, len(ageing_candidates))
+        with profiler.stage('insert_label_values'):
+            insert_label_values(tasks)
+        profiler.add_rows('insert_label_values', len(tasks))
+        tasks_by_ageing_output[ageing_output] = tasks
+
+    # The summaries only have the ageing days when they are values
+    summary_sheets = None
+    if 'values' in tasks_by_ageing_output:
+        tasks = tasks_by_ageing_output['values']
+        with profiler.stage('summaries'):
+            summary_sheets = get_summary_sheets(tasks, get_template_metadata()['pivot_tables'])
+        profiler.add_rows('summaries', len(tasks))
+
+    for engine in list(options['engines']):
+        for ageing_output, tasks in tasks_by_ageing_output.items():
+            stage = f"create_dashboard_report[{engine}, {ageing_output}]"
+            try:
+                with profiler.stage(stage):
+                    dashboard_writers[engine](template_path, reports_dir, tasks, new_file_name, lattest_report_dir, tasks_to_be_ignored, None, summary_sheets)
+            except Exception as e:
+                # xlwings and batched need a desktop Excel
+                print(f"Skipping the {engine} engine: {e}")
+                profiler.stages.pop()
+                options['engines'].remove(engine)
+                break
+            profiler.add_rows(stage, len(tasks))
+
+    tasks = next(iter(tasks_by_ageing_output.values()))
+    for writer in options['writers']:
+        stage = f"create_financial_report[{writer}]"
+        with profiler.stage(stage):
+            create_financial_report(tasks, financial_data_frame, writer, lattest_report_dir, Logger(log_path=logger_path, formats=[]))
+        profiler.add_rows(stage, len(financial_data_frame))
+
+def get_best_stages(stages: list) -> list:
+    """Keep the fastest run of every stage, in the order the stages first ran, with the rows per second."""
+    best_stages = {}
+    for record in stages:
+        best = best_stages.get(record['name'])
+        if best is None or record['wall'] < best['wall']:
+            best_stages[record['name']] = dict(record)
+    for record in best_stages.values():
+        record['rows_per_second'] = record['rows'] / record['wall'] if record['rows'] and record['wall'] else None
+    return list(best_stages.values())
+
+def load_previous_result(path: str, parameters: dict) -> dict:
+    """Return the last stored result measured with the same parameters, or None."""
+    if not os.path.isfile(path):
+        return None
+    previous = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get('parameters') == parameters:
+                previous = result
+    return previous
+
+def save_result(path: str, result: dict):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result) + '\n')
+
+def render_results(stages: list, previous: dict = None) -> str:
+    """Render the best run of every stage as a table, with the change against the previous result."""
+    previous_walls = {record['name']: record['wall'] for record in previous['stages']} if previous else {}
+    trace_memory = any(record['peak_memory_mb'] is not None for record in stages)
+    memory_header = f"{'Peak (MB)':>12}" if trace_memory else ''
+    lines = [f"{'Stage':<44}{'Wall (s)':>10}{'CPU (s)':>10}{memory_header}{'Rows':>10}{'Rows/s':>12}{'Change':>10}"]
+    for record in stages:
+        rows_per_second = f"{record['rows_per_second']:.0f}" if record['rows_per_second'] else ''
+        change = ''
+        previous_wall = previous_walls.get(record['name'])
+        if previous_wall:
+            ratio = record['wall'] / previous_wall - 1
+            change = f"{ratio:+.1%}" + (' !' if ratio > regression_threshold else '')
+        memory = f"{record['peak_memory_mb']:>12.1f}" if trace_memory else ''
+        lines.append(f"{record['name']:<44}{record['wall']:>10.3f}{record['cpu']:>10.3f}{memory}{record['rows'] or '':>10}{rows_per_second:>12}{change:>10}")
+    lines.append(f"Process peak memory: {get_process_peak_memory_mb():.1f} MB")
+    return '\n'.join(lines)
+
+def parse_arguments(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure the throughput of every stage of the reports on synthetic or real exports.")
+    parser.add_argument('--inputs', nargs='+', help="Exports to measure, files, globs or folders, instead of the synthetic ones")
+    parser.add_argument('--tasks', type=int, default=5000, help="Number of synthetic tasks of all the sites together")
+    parser.add_argument('--sites', type=int, default=4, help="Number of synthetic boards")
+    parser.add_argument('--density', type=float, default=0.7, help="Share of the description keys that have dates")
+    parser.add_argument('--malformed', type=float, default=0.1, help="Share of the descriptions with a malformed line")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic exports")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of every stage, the fastest one is kept")
+    parser.add_argument('--engines', nargs='+', choices=list(dashboard_writers), default=['headless'], help="Dashboard writers to compare")
+    parser.add_argument('--ageing-outputs', nargs='+', choices=['formulas', 'values'], default=['formulas', 'values'], help="Ageing outputs to compare")
+    parser.add_argument('--writers', nargs='+', choices=['pandas', 'streaming'], default=['pandas', 'streaming'], help="Financial writers to compare")
+    parser.add_argument('--profile-stage', help="Stage to dump with cProfile, for example 'parse_descriptions'")
+    parser.add_argument('--trace-memory', action='store_true', help="Trace the peak memory of every stage, the stages run several times slower")
+    parser.add_argument('--results', default=results_path, help="JSON lines file with the history of the results")
+    parser.add_argument('--no-save', action='store_true', help="Don't add this run to the history")
+    return parser.parse_args(argv)
+
+def main(argv: list = None) -> int:
+    args = parse_arguments(argv)
+    file_paths = expand_input_paths(args.inputs) if args.inputs else None
+    if args.inputs and not file_paths:
+        print("No Excel files found in: " + ", ".join(args.inputs), file=sys.stderr)
+        return EXIT_USAGE
+    results = os.path.abspath(args.results)
+    os.chdir(scripts_directory)
+
+    options = {'engines': args.engines, 'ageing_outputs': args.ageing_outputs, 'writers': args.writers}
+    if file_paths:
+        parameters = {'inputs': file_paths}
+    else:
+        parameters = {'tasks': args.tasks, 'sites': args.sites, 'density': args.density, 'malformed': args.malformed, 'seed': args.seed}
+    parameters.update({key: list(value) for key, value in options.items()})
+    if args.trace_memory:
+        # Traced runs are only compared with traced runs
+        parameters['trace_memory'] = True
+
+    profiler = RunProfiler(enabled=True, stage_to_profile=args.profile_stage, trace_memory=args.trace_memory)
+    with tempfile.TemporaryDirectory() as output_dir:
+        if not file_paths:
+            print(f"Generating {args.tasks} synthetic tasks in {args.sites} sites...")
+            file_paths = generate_exports(os.path.join(output_dir, 'Exports'), args.tasks, args.sites, args.density, args.malformed, args.seed)
+        for run in range(1, args.repeat + 1):
+            print(f"Run {run} of {args.repeat}...")
+            run_stages(file_paths, options, output_dir, profiler)
+
+    stages = get_best_stages(profiler.stages)
+    previous = load_previous_result(results, parameters)
+    print(render_results(stages, previous))
+
+    if not args.no_save:
+        save_result(results, {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'parameters': parameters,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'stages': stages,
+        })
+    return EXIT_SUCCESS
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import os
+import pickle
+import threading
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+from variables import other_PTO_days, calendar_years_before, calendar_years_after, business_calendar_path
+
+# Bump it when the way the calendar is built changes, so the stored one is built again
+calendar_version = 1
+# Monday to Friday, the weekends = 1 of NETWORKDAYS.INTL
+weekmask = '1111100'
+# The GUI warms the calendar up in the background while a run may already need it
+calendar_lock = threading.Lock()
+
+def get_holidays_by_year(first_year: int, last_year: int, cal=None) -> dict:
+    """The federal holidays and the PTO days of every year as mm/dd/yyyy strings."""
+    if cal is None:
+        from workalendar.usa import UnitedStates
+        cal = UnitedStates()
+    holidays_by_year = {}
+    for year in range(first_year, last_year + 1):
+        holidays = [date.strftime('%m/%d/%Y') for date, name in cal.holidays(year)]
+        holidays_by_year[year] = holidays + [f"{month_day}/{year}" for month_day in other_PTO_days]
+    return holidays_by_year
+
+class BusinessDayCalendar:
+    def __init__(self, first_year: int, last_year: int, holidays_by_year: dict, business_days_before: np.ndarray = None):
+        """Monday to Friday calendar without the holidays, from the first day of first_year to the last day of last_year.
+        business_days_before[i] is the number of business days before the i-th day of the span, so counting the days of an interval is two lookups."""
+        self.first_year = first_year
+        self.last_year = last_year
+        self.holidays_by_year = holidays_by_year
+        holidays = [holiday for year_holidays in holidays_by_year.values() for holiday in year_holidays]
+        self.holidays = np.unique(np.array([datetime.strptime(holiday, '%m/%d/%Y') for holiday in holidays], dtype='datetime64[D]'))
+        self.first_day = np.datetime64(f"{first_year}-01-01", 'D')
+        self.end_day = np.datetime64(f"{last_year + 1}-01-01", 'D')
+        if business_days_before is None:
+            is_business_day = np.is_busday(np.arange(self.first_day, self.end_day), weekmask=weekmask, holidays=self.holidays)
+            business_days_before = np.concatenate(([0], np.cumsum(is_business_day))).astype(np.int32)
+        self.business_days_before = business_days_before
+        # Used for the days outside the span, they only skip the weekends and the holidays of the span
+        self.busdaycalendar = np.busdaycalendar(weekmask=weekmask, holidays=self.holidays)
+        self.holidays_literals = {}
+
+    def count(self, first_dates: np.ndarray, last_dates: np.ndarray) -> np.ndarray:
+        """Number of business days from each first date to its last date, both included, the first dates can't be after the last ones."""
+        first_offsets = (first_dates - self.first_day).astype(np.int64)
+        end_offsets = (last_dates - self.first_day).astype(np.int64) + 1
+        in_span = (first_offsets >= 0) & (end_offsets <= len(self.business_days_before) - 1)
+        counts = np.empty(len(first_dates), dtype=np.int64)
+        counts[in_span] = self.business_days_before[end_offsets[in_span]] - self.business_days_before[first_offsets[in_span]]
+        if not in_span.all():
+            counts[~in_span] = np.busday_count(first_dates[~in_span], last_dates[~in_span] + np.timedelta64(1, 'D'), busdaycal=self.busdaycalendar)
+        return counts
+
+    def get_holidays_literal(self, first_year: int = None, last_year: int = None) -> str:
+        """The holidays of the years as an array literal for NETWORKDAYS.INTL, all the years of the calendar by default."""
+        first_year = max(first_year or self.first_year, self.first_year)
+        last_year = min(last_year or self.last_year, self.last_year)
+        if first_year > last_year:
+            # None of the holidays fall in the years, any of them give the same count
+            first_year, last_year = self.first_year, self.last_year
+        key = (first_year, last_year)
+        if key not in self.holidays_literals:
+            # Observed holidays can be listed with the next or the previous year, the dates are filtered by their own year
+            holidays = [holiday for year in range(first_year - 1, last_year + 2) for holiday in self.holidays_by_year.get(year, [])
+                        if first_year <= int(holiday[-4:]) <= last_year]
+            self.holidays_literals[key] = '{' + ','.join(f'"{holiday}"' for holiday in dict.fromkeys(holidays)) + '}'
+        return self.holidays_literals[key]
+
+    def get_state(self) -> dict:
+        return {
+            'version': calendar_version,
+            'first_year': self.first_year,
+            'last_year': self.last_year,
+            'other_PTO_days': list(other_PTO_days),
+            'holidays_by_year': self.holidays_by_year,
+            'business_days_before': self.business_days_before,
+        }
+
+def read_business_calendar(first_year: int, last_year: int, path: str = business_calendar_path) -> BusinessDayCalendar:
+    """Return the stored calendar when it was built for the same years and PTO days, otherwise None."""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"Failed to read the business-day calendar, building it again: {e}")
+        return None
+    if not isinstance(state, dict) or state.get('version') != calendar_version:
+        return None
+    if (state['first_year'], state['last_year'], state['other_PTO_days']) != (first_year, last_year, list(other_PTO_days)):
+        return None
+    return BusinessDayCalendar(first_year, last_year, state['holidays_by_year'], state['business_days_before'])
+
+def save_business_calendar(calendar: BusinessDayCalendar, path: str = business_calendar_path):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as f:
+        pickle.dump(calendar.get_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+@lru_cache(maxsize=None)
+def load_business_calendar(year: int) -> BusinessDayCalendar:
+    """Return the calendar of the years around year, built with workalendar only when the stored one doesn't cover them."""
+    first_year, last_year = year - calendar_years_before, year + calendar_years_after
+    calendar = read_business_calendar(first_year, last_year)
+    if calendar is None:
+        calendar = BusinessDayCalendar(first_year, last_year, get_holidays_by_year(first_year, last_year))
+        try:
+            save_business_calendar(calendar)
+        except Exception as e:
+            print(f"Failed to store the business-day calendar: {e}")
+    return calendar
+
+def get_business_calendar() -> BusinessDayCalendar:
+    """Return the calendar around the current year, a process that runs past New Year gets the one of the new year."""
+    with calendar_lock:
+        return load_business_calendar(datetime.now().year)
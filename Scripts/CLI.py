@@ -0,0 +1,85 @@
+import argparse
+import glob
+import os
+import sys
+import traceback
+
+# Exit codes
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+
+# The relative paths of variables.py are relative to this folder
+scripts_directory = os.path.dirname(os.path.abspath(__file__))
+
+def expand_input_paths(patterns: list) -> list:
+    """Return the Excel files matched by the paths, globs and folders, in order and without repetitions."""
+    file_paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, '*.xlsx')))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+        for match in matches:
+            file_path = os.path.abspath(match)
+            if os.path.isfile(file_path) and file_path.lower().endswith('.xlsx') and file_path not in file_paths:
+                file_paths.append(file_path)
+    return file_paths
+
+def parse_arguments(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the Financial and Dashboard reports from the Planner exports, without the GUI.")
+    parser.add_argument('inputs', nargs='+', help="Excel files, globs (quote them) or folders with the exported boards and the financial file")
+    parser.add_argument('--financial', action='store_true', help="Create the financial report")
+    parser.add_argument('--dashboard', action='store_true', help="Create the dashboard report")
+    parser.add_argument('--analyze-only', action='store_true', help="Only analyze the descriptions and write the log")
+    parser.add_argument('--engine', choices=['xlwings', 'batched', 'headless'], help="Dashboard writer, the default is the one of variables.py")
+    parser.add_argument('--output-dir', help="Folder of the report history")
+    parser.add_argument('--latest-dir', help="Folder with the Dashboard and Financial folders of the latest reports")
+    parser.add_argument('--log-file', help="Where the descriptions analysis is written")
+    parser.add_argument('--incremental', action='store_true', help="Reuse the results of the tasks that didn't change since the last run")
+    args = parser.parse_args(argv)
+
+    if args.analyze_only and (args.financial or args.dashboard):
+        parser.error("--analyze-only can't be combined with --financial or --dashboard")
+    if not (args.financial or args.dashboard or args.analyze_only):
+        parser.error("choose at least one of --financial, --dashboard or --analyze-only")
+    return args
+
+def main(argv: list = None) -> int:
+    args = parse_arguments(argv)
+
+    # Resolve every path before moving to the scripts folder
+    file_paths = expand_input_paths(args.inputs)
+    if not file_paths:
+        print("No Excel files found in: " + ", ".join(args.inputs), file=sys.stderr)
+        return EXIT_USAGE
+    output_dir = os.path.abspath(args.output_dir) if args.output_dir else None
+    latest_dir = os.path.abspath(args.latest_dir) if args.latest_dir else None
+    log_file = os.path.abspath(args.log_file) if args.log_file else None
+    os.chdir(scripts_directory)
+
+    try:
+        # Imported after the arguments are checked, so --help and usage errors return right away
+        import Custom
+
+        options = {'incremental': args.incremental} if args.incremental else {}
+        if args.engine:
+            options['engine'] = args.engine
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            options['reports_dir'] = output_dir
+        if latest_dir:
+            for folder in ('Dashboard', 'Financial'):
+                os.makedirs(os.path.join(latest_dir, folder), exist_ok=True)
+            options['lattest_report_dir'] = latest_dir
+        if log_file:
+            options['log_path'] = log_file
+
+        Custom.excecute(file_paths, (args.financial, args.dashboard, args.analyze_only), **options)
+    except Exception:
+        traceback.print_exc()
+        return EXIT_FAILURE
+    return EXIT_SUCCESS
+
+if __name__ == "__main__":
+    sys.exit(main())
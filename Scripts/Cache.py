@@ -0,0 +1,115 @@
+import os
+import re
+import time
+import hashlib
+from typing import Any, Callable
+import pandas as pd
+from variables import cache_directory_path, cache_max_size_mb, cache_max_age_days
+
+# Bump it when the way the files are parsed changes, so old entries are not used anymore
+cache_version = 4
+
+# Entries kept in memory by long-running processes, None when disabled
+memory_cache = None
+memory_cache_used = set()
+
+def enable_memory_cache():
+    """Keep the entries in memory too, so a process that runs the reports again doesn't read them from disk."""
+    global memory_cache
+    if memory_cache is None:
+        memory_cache = {}
+
+def trim_memory_cache():
+    """Forget the entries that were not used since the last trim, so only the current files stay in memory."""
+    for cache_path in set(memory_cache or {}) - memory_cache_used:
+        del memory_cache[cache_path]
+    memory_cache_used.clear()
+
+def get_memory_copy(result: Any) -> Any:
+    # The callers may modify the DataFrames they get
+    return result.copy() if isinstance(result, pd.DataFrame) else result
+
+def hash_file(file_path: str) -> str:
+    """Return the SHA-256 of the file content."""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+# Names of the entries written by get_cache_path, of any version, the other files of the folder are never evicted
+cache_entry_regex = re.compile(r'^\w+-v\d+-[0-9a-f]{64}\.pkl$')
+
+def get_cache_path(kind: str, file_hash: str) -> str:
+    return os.path.join(cache_directory_path, f"{kind}-v{cache_version}-{file_hash}.pkl")
+
+def read_cached(file_path: str, read: Callable[[str], Any], kind: str) -> Any:
+    """Return the DataFrame, or any other picklable result, of a file parsed by read, reusing the copy stored for a file with the same content."""
+    cache_path = get_cache_path(kind, hash_file(file_path))
+
+    if memory_cache is not None:
+        memory_cache_used.add(cache_path)
+        if cache_path in memory_cache:
+            return get_memory_copy(memory_cache[cache_path])
+
+    if os.path.isfile(cache_path):
+        try:
+            df = pd.read_pickle(cache_path)
+            # Keep the entry alive for the eviction
+            os.utime(cache_path)
+            if memory_cache is not None:
+                memory_cache[cache_path] = df
+                return get_memory_copy(df)
+            return df
+        except Exception as e:
+            print(f"Failed to read the cached copy of {file_path}: {e}")
+            remove_cache_file(cache_path)
+
+    df = read(file_path)
+    if memory_cache is not None:
+        memory_cache[cache_path] = df
+        df = get_memory_copy(df)
+
+    try:
+        if not os.path.exists(cache_directory_path):
+            os.makedirs(cache_directory_path, exist_ok=True)
+        # Write to a temporary file first so parallel workers never read a half written entry
+        temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+        pd.to_pickle(df, temporary_path)
+        os.replace(temporary_path, cache_path)
+        evict_cache()
+    except Exception as e:
+        print(f"Failed to cache {file_path}: {e}")
+
+    return df
+
+def remove_cache_file(cache_path: str):
+    try:
+        os.remove(cache_path)
+    except OSError:
+        pass  # Another process already removed it
+
+def evict_cache(max_size_mb: float = cache_max_size_mb, max_age_days: float = cache_max_age_days):
+    """Delete the entries not used in max_age_days, then the least recently used ones until the cache fits in max_size_mb."""
+    if not os.path.isdir(cache_directory_path):
+        return
+
+    entries = []
+    for file_name in os.listdir(cache_directory_path):
+        cache_path = os.path.join(cache_directory_path, file_name)
+        if cache_entry_regex.match(file_name) and os.path.isfile(cache_path):
+            try:
+                stat = os.stat(cache_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, cache_path))
+
+    oldest_allowed = time.time() - max_age_days * 24 * 60 * 60
+    max_size = max_size_mb * 1024 * 1024
+    total_size = sum(size for _, size, _ in entries)
+
+    # Least recently used first
+    for last_used, size, cache_path in sorted(entries):
+        if last_used < oldest_allowed or total_size > max_size:
+            remove_cache_file(cache_path)
+            total_size -= size
@@ -1,15 +1,23 @@
 from enum import Enum
 from typing import Callable, List
 from datetime import datetime
+from bisect import bisect_right
+from itertools import accumulate
+from concurrent.futures import ProcessPoolExecutor
+import io
 import re
+import warnings
+import numpy as np
 import pandas as pd
-from workalendar.usa import UnitedStates
 from Logger import Logger
 from variables import *
 from Utils import *
-from openpyxl import load_workbook
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from openpyxl.utils import get_column_letter
+from Cache import read_cached
+from Incremental import get_fingerprints, get_reusable_rows, load_state, save_state
+from Template import get_template, get_template_metadata
+from Summary import get_summary_sheets, write_summary_sheets_xlwings
+from Profiler import RunProfiler
+from BusinessDays import get_business_calendar
 from datetime import datetime
 
 class desc_keys(Enum):
@@ -210,118 +218,223 @@ ageing_params = [
     AgeingParam(key=columns.VerificationComplete.value, start_dates=desc_keys.ReadyToMigrateDate.value, end_dates=desc_keys.VerificationCompleteDate.value, date_pos=0, category=Category.Network.value)
 ]
 
-def is_leap_year(year: int) -> bool:
-    """Determine if a given year is a leap year."""
-    return (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)
-
-def is_valid_date(date_string: str) -> bool:
-    """Check if the provided date string is a valid date."""
-    valid_date = True
-    try:
-        date_numbers_strings = date_string.split('/')
-        if len(date_numbers_strings) != 3:
-            return False
-
-        month, day, year = date_numbers_strings[0],date_numbers_strings[1],date_numbers_strings[2]
-        if (len(year) != 2 and len(year) != 4) or len(day) > 2 or len(month) > 2:
-            return False
-
-        # Parse the month, day, and year
-        month, day, year = map(int, date_numbers_strings)
-        
-        # Days in each month
-        days_in_month = [31, 29 if is_leap_year(year) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-
-        # Validate the ranges of month, day, and year
-        if not (1 <= month <= 12):
-            valid_date = False
-        elif not (1 <= day <= days_in_month[month - 1]):
-            valid_date = False
-
-        # Handle two-digit year conversion
-        current_year = datetime.now().year
-        century = (current_year // 100) * 100
-        if len(str(year)) == 2:
-            year += century
-
-        # Validate the year range
-        if not (1900 <= year <= century + 999):
-            valid_date = False
-
-    except (ValueError, IndexError):
-        valid_date = False
-
-    return valid_date
-
-def parse_descriptions(template: pd.DataFrame, logger: Logger):
-    """Parse 'Description' column to extract key-value pairs and dates, mapping 'Task ID' to the processed description."""
+more_than_one_space_regex = re.compile(r'\s+')
+date_regex = re.compile(r'\b(\d{1,2}/\d{1,2}/\d{2,4})\b')  # Regex to match MM/DD/YY or MM/DD/YYYY
+desc_keys_set = frozenset(desc_keys_values)
+key_positions = {key: position for position, key in enumerate(desc_keys_values)}
+
+def parse_dates(date_strings: list) -> np.ndarray:
+    """Parse mm/dd/yy or mm/dd/yyyy strings into datetime64[D], invalid dates, three digit years and years before 1900 become NaT."""
+    # The same few dates repeat across the whole board, parse each of them only once
+    codes, unique_dates = pd.factorize(pd.Series(date_strings, dtype=object))
+    parts = pd.Series(unique_dates, dtype=object).str.split('/', expand=True).reindex(columns=range(3))
+    month, day, year = (pd.to_numeric(parts[i], errors='coerce') for i in range(3))
+    year = get_four_digit_year(year)
+    year = year.where(parts[2].str.len().isin([2, 4]) & (year >= 1900))
+    dates = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': day}), errors='coerce')
+    return dates.values.astype('datetime64[D]')[codes]
+
+class DescriptionDates:
+    def __init__(self, task_ids, keys: list, date_tasks, date_keys, date_codes, texts, dates: np.ndarray = None):
+        """The dates of the description keys of every task, one entry per date in flat arrays."""
+        # date_tasks, date_keys and date_codes are the positions of the task, the key and the date text of every entry,
+        # texts has the distinct dates as they are written and dates their value, NaT for the invalid ones
+        self.task_ids = np.asarray(task_ids, dtype=object)
+        self.keys = list(keys)
+        self.texts = np.asarray(texts, dtype=object)
+        if dates is None:
+            dates = parse_dates(self.texts) if len(self.texts) else np.array([], dtype='datetime64[D]')
+        self.dates = dates
+        # By key and task, the dates of a key of a task stay in the order they are written,
+        # the dates of the i-th task for a key are codes[key][offsets[key][i]:offsets[key][i + 1]]
+        order = np.argsort(np.asarray(date_keys, dtype=np.int64) * len(self.task_ids) + date_tasks, kind='stable')
+        self.date_tasks = np.asarray(date_tasks, dtype=np.int64)[order]
+        self.date_keys = np.asarray(date_keys, dtype=np.int64)[order]
+        self.date_codes = np.asarray(date_codes, dtype=np.int32)[order]
+        key_starts = np.searchsorted(self.date_keys, np.arange(len(self.keys) + 1))
+        self.offsets = {}
+        self.codes = {}
+        for position, key in enumerate(self.keys):
+            start, end = key_starts[position], key_starts[position + 1]
+            lengths = np.bincount(self.date_tasks[start:end], minlength=len(self.task_ids))
+            self.offsets[key] = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+            self.codes[key] = self.date_codes[start:end]
+
+    def __len__(self):
+        return len(self.task_ids)
+
+    def select(self, mask):
+        """Return the table of the tasks where mask is True."""
+        mask = np.asarray(mask, dtype=bool)
+        positions = np.cumsum(mask) - 1
+        kept = mask[self.date_tasks]
+        return DescriptionDates(self.task_ids[mask], self.keys, positions[self.date_tasks[kept]], self.date_keys[kept], self.date_codes[kept], self.texts, self.dates)
+
+    @staticmethod
+    def concat(tables: list):
+        """Return the table of the tasks of every table, one after the other, the tables have the same keys."""
+        text_offsets = np.cumsum([0] + [len(table.texts) for table in tables])
+        task_offsets = np.cumsum([0] + [len(table) for table in tables])
+        # The dates repeat across the tables, each of them is stored once
+        codes, texts = pd.factorize(pd.Series(np.concatenate([table.texts for table in tables]), dtype=object))
+        dates = np.empty(len(texts), dtype='datetime64[D]')
+        dates[codes] = np.concatenate([table.dates for table in tables])
+        return DescriptionDates(
+            np.concatenate([table.task_ids for table in tables]),
+            tables[0].keys,
+            np.concatenate([table.date_tasks + task_offset for table, task_offset in zip(tables, task_offsets)]),
+            np.concatenate([table.date_keys for table in tables]),
+            codes[np.concatenate([table.date_codes + text_offset for table, text_offset in zip(tables, text_offsets)])],
+            texts,
+            dates,
+        )
+
+    def get_state(self) -> dict:
+        """The arrays of the table, DescriptionDates(**state) builds it again."""
+        return {
+            'task_ids': self.task_ids,
+            'keys': self.keys,
+            'date_tasks': self.date_tasks,
+            'date_keys': self.date_keys,
+            'date_codes': self.date_codes,
+            'texts': self.texts,
+            'dates': self.dates,
+        }
+
+    def get_lengths(self, key: str) -> np.ndarray:
+        """Number of dates of every task."""
+        return np.diff(self.offsets[key])
+
+    def get_first_texts(self, key: str) -> list:
+        """First date of every task as it is written, '' for the tasks without dates."""
+        first_texts = np.full(len(self.task_ids), '', dtype=object)
+        has_dates = self.get_lengths(key) > 0
+        first_texts[has_dates] = self.texts[self.codes[key][self.offsets[key][:-1][has_dates]]]
+        return first_texts.tolist()
+
+    def get_intervals(self, param: AgeingParam) -> tuple:
+        """Return the task, start code and end code of every interval of the param, the open intervals get the end code -1."""
+        # With date_pos only the interval at that position is used, the end dates are filled up to the start dates with today
+        start_lengths = self.get_lengths(param.start_dates)
+        end_lengths = self.get_lengths(param.end_dates)
+        if param.date_pos is None:
+            tasks = np.repeat(np.arange(len(self.task_ids)), start_lengths)
+            start_positions = np.arange(len(tasks)) - np.repeat(self.offsets[param.start_dates][:-1], start_lengths)
+            end_positions = start_positions
+        else:
+            tasks = np.flatnonzero(start_lengths > 0)
+            start_positions = np.mod(param.date_pos, start_lengths[tasks])
+            end_positions = np.mod(param.date_pos, np.maximum(start_lengths[tasks], end_lengths[tasks]))
+        start_codes = self.codes[param.start_dates][self.offsets[param.start_dates][tasks] + start_positions]
+        has_end = end_positions < end_lengths[tasks]
+        end_codes = np.full(len(tasks), -1, dtype=np.int32)
+        end_codes[has_end] = self.codes[param.end_dates][self.offsets[param.end_dates][tasks[has_end]] + end_positions[has_end]]
+        return tasks, start_codes, end_codes
+
+def find_key_lines(description_text: str, lines: list, keys: list) -> dict:
+    """Return the lines where each of the keys appears, searching the whole description instead of every line."""
+    key_lines = {}
+    line_starts = None
+    for key in keys:
+        position = description_text.find(key)
+        if position == -1:
+            continue
+        if line_starts is None:
+            line_starts = list(accumulate([0] + [len(line) + 1 for line in lines[:-1]]))
+        line_indexes = []
+        while position != -1:
+            line_index = bisect_right(line_starts, position) - 1
+            if not line_indexes or line_indexes[-1] != line_index:
+                line_indexes.append(line_index)
+            position = description_text.find(key, position + 1)
+        key_lines[key] = [lines[line_index] for line_index in line_indexes]
+    return key_lines
+
+def parse_descriptions(template: pd.DataFrame, logger: Logger) -> DescriptionDates:
+    """Parse the 'Description' column into the DescriptionDates of the tasks with a description and log the issues of the descriptions."""
     description_column = template['Description']
     task_ids = template['Task ID']
     sites = template['Site']
     task_names = template['Task Name']
-    
-    result_map = {}  # Initialize the result map to store processed data
-    
-    for task_id, text, site, task_name in zip(task_ids, description_column, sites, task_names):
+
+    descriptions = []  # Lower case description of every task
+    line_rows, line_keys, line_texts = [], [], []  # One entry per key line: the position of its task, the position of its key and the line
+    date_lines, date_texts = [], []  # One entry per date: its key line and the date as it is written
+
+    for text in description_column:
         description_text = text.lower()
-        more_than_one_space_regex = re.compile(r'\s+')
         if pd.isna(description_text):
             description_text = ''  # Replace NaN or None with an empty string if necessary
-        
-        if len(description_text) == 0:
+        row = len(descriptions)
+        descriptions.append(description_text)
+
+        for line in description_text.split('\n'):
+            # Only lines with a single colon are key-value pairs
+            if line.count(':') != 1:
+                continue
+            key_text, value_text = line.split(':', 1)
+            key = key_text.strip()  # Key is before the colon
+            if key not in desc_keys_set:
+                key = more_than_one_space_regex.sub(' ', key).strip()
+
+            # Check if the key is a valid key
+            if key not in desc_keys_set:
+                continue  # Skip keys with invalid characters
+
+            # Extract dates from the value
+            dates = date_regex.findall(value_text)
+            date_lines.extend([len(line_rows)] * len(dates))
+            date_texts.extend(dates)
+            line_rows.append(row)
+            line_keys.append(key_positions[key])
+            line_texts.append(line)
+
+    empty = np.array([len(description_text) == 0 for description_text in descriptions], dtype=bool)
+    line_rows = np.array(line_rows, dtype=np.int64)
+    line_keys = np.array(line_keys, dtype=np.int64)
+    date_lines = np.array(date_lines, dtype=np.int64)
+    # The same dates repeat across the board, each of them is parsed and validated once
+    date_codes, texts = pd.factorize(pd.Series(date_texts, dtype=object))
+    texts = np.asarray(texts, dtype=object)
+    dates = parse_dates(texts) if len(texts) else np.array([], dtype='datetime64[D]')
+    invalid_lines = np.unique(date_lines[np.isnat(dates)[date_codes]])
+
+    # A key written on several lines gets the dates of its last line
+    last_lines = ~pd.Series(line_rows * expected_length + line_keys).duplicated(keep='last').to_numpy()
+    last_dates = last_lines[date_lines]
+    task_positions = np.cumsum(~empty) - 1
+    description_dates = DescriptionDates(task_ids.to_numpy()[~empty], desc_keys_values, task_positions[line_rows[date_lines[last_dates]]],
+                                         line_keys[date_lines[last_dates]], date_codes[last_dates], texts, dates)
+
+    # Diagnostics are logged task by task, in the order of the template
+    invalid_lines_by_row = {}
+    for line in invalid_lines:
+        invalid_lines_by_row.setdefault(int(line_rows[line]), []).append(line_texts[line])
+    has_key = np.zeros((len(descriptions), expected_length), dtype=bool)
+    has_key[line_rows, line_keys] = True
+    key_counts = has_key.sum(axis=1)
+    for row, (task_id, site, task_name) in enumerate(zip(task_ids, sites, task_names)):
+        if empty[row]:
             logger.INFO("", task_id, task_name, site, "Empty Description")
-            continue  # Skip further processing for empty descriptions
+            continue
 
-        result_map[task_id] = {}
-        
-        # Split description text into lines
-        lines = description_text.split('\n')
-        
-        for line in lines:
-            if ':' in line and len(line.split(':')) == 2:
-                pair = line.split(':', 1)
-                key = more_than_one_space_regex.sub(' ', pair[0]).lower().strip()  # Key is before the colon
-                value = more_than_one_space_regex.sub(' ', pair[1]).strip()  # Value is after the colon
-                
-                # Check if the key is a valid key
-                if key not in desc_keys_values:
-                    continue  # Skip keys with invalid characters
-
-                # Extract dates from the value
-                date_regex = re.compile(r'\b(\d{1,2}/\d{1,2}/\d{2,4})\b')  # Regex to match MM/DD/YY or MM/DD/YYYY
-                dates = []
-                
-                # If the value contains dates
-                if any(date_regex.search(val) for val in value.split(';')):
-                    dates = [date_match.group(1) for date_match in date_regex.finditer(value)]
-                
-                # If value does not contain dates or is not valid
-                inValidDates = []
-                if not dates:
-                    dates = []  # Set to empty list if no valid dates are found or if value is invalid
-                else:
-                    inValidDates = [date for date in dates if not is_valid_date(date)]
-
-                if len(inValidDates) != 0:
-                    logger.ERROR(line, task_id, task_name, site, "Invalid Date")
-                
-                result_map[task_id][key] = dates  # Store dates in the result map under the key
-
-        # Check for missing keys
-        collected_keys = list(result_map[task_id].keys())
-        intersection = [key_ for key_ in desc_keys_values if key_ in collected_keys]
-        if(len(intersection) == 0):
+        for line in invalid_lines_by_row.get(row, []):
+            logger.ERROR(line, task_id, task_name, site, "Invalid Date")
+
+        # Check for missing keys, only valid keys are collected
+        if key_counts[row] == 0:
             logger.INFO("", task_id, task_name, site, "This Task does not contain info for ageing - If this is the idea, just ignore, if not check the format")
-        elif len(intersection) != expected_length:
-            differences = [key_ for key_ in desc_keys_values if key_ not in collected_keys]
-            if len(differences) != 0:
-                for difference in differences:
-                    issueLines = [line for line in lines if difference in line]
-                    if len(issueLines) == 1:
-                        logger.ERROR(issueLines[0], task_id, task_name, site, f"The key '{difference}' was found on this line, but it is not properly formatted")
-                    elif len(issueLines) == 0:
-                        logger.ERROR("", task_id, task_name, site, f"The key '{difference}' was not found")
-    return result_map
+        elif key_counts[row] != expected_length:
+            description_text = descriptions[row]
+            differences = [key_ for key_, has in zip(desc_keys_values, has_key[row]) if not has]
+            key_lines = find_key_lines(description_text, description_text.split('\n'), differences)
+            for difference in differences:
+                issueLines = key_lines.get(difference, [])
+                if len(issueLines) == 1:
+                    logger.ERROR(issueLines[0], task_id, task_name, site, f"The key '{difference}' was found on this line, but it is not properly formatted")
+                elif len(issueLines) == 0:
+                    logger.ERROR("", task_id, task_name, site, f"The key '{difference}' was not found")
+    return description_dates
 
 def assign_sites(template,sites_dict):
     # Asign the site to each row
@@ -332,90 +445,136 @@ def assign_sites(template,sites_dict):
 
     return template
 
-def one_date(dates, pos):
-    """Returns the first element of the array if it is not empty, otherwise returns None."""
-    return [dates[pos]] if dates else []
-
-def get_us_holidays_current_year_for_networkdays(cal = UnitedStates()) -> str:
-    """Get the US holidays for the current year formatted for NETWORKDAYS.INTL in Excel."""
-    # Get the current year
-    year = datetime.now().year
+# The business-day calendar is loaded the first time a run needs it, not when the module is imported
+def get_holidays_range() -> str:
+    """The holidays array literal of every year of the business-day calendar, the value of the holidays_name defined name."""
+    return get_business_calendar().get_holidays_literal()
 
-    # Get holidays for the current year
-    holidays = cal.holidays(year)
+def warm_up():
+    """Load the business-day calendar ahead of the first run, the GUI calls it in the background while the files are picked."""
+    get_business_calendar()
 
-    # Format holidays as mm/dd/yyyy
-    formatted_holidays = [date.strftime('%m/%d/%Y') for date, name in holidays]
-    formatted_holidays += other_PTO_dates
-    # Join the holidays with commas and add curly braces
-    return '{' + ','.join(f'"{date}"' for date in formatted_holidays) + '}'
-
-
-holidays_range = get_us_holidays_current_year_for_networkdays()
-def insert_network_days_formula(task_id, param: AgeingParam, candidate, template):
-    formula = ''
-    now = datetime.now()  # Current date
+def get_network_days_formulas(param: AgeingParam, description_dates: DescriptionDates, today: str, holidays: str = None) -> list:
+    """Build the NETWORKDAYS.INTL formula of every task for the given param, with the holidays name or the holidays of each interval."""
     weekends = 1
-    start_dates = candidate[param.start_dates]
-    end_dates:list = candidate[param.end_dates]
-    
-
-    while len(end_dates) < len(start_dates):
-        current_date = now.strftime('%m/%d/%y')
-        end_dates.append(current_date)
-
-    # If using only the first date in the ranges
-    date_pos = param.date_pos
-    if date_pos is not None:
-        start_dates = one_date(candidate[param.start_dates], date_pos)
-        end_dates = one_date(candidate[param.end_dates], date_pos)
-        
-            
-
-    for start_date, end_date in zip(start_dates, end_dates):
-        # Directly use start_date and end_date if they are already in mm/dd/yy format
-        formula += f'NETWORKDAYS.INTL("{start_date}", "{end_date}", {weekends}, {holidays_range})+'
-
-    formula = '=0' if len(formula) == 0 else f"=ABS({formula[:-1]})"  # Remove the trailing '+'
-
-    # Update the template DataFrame
-    template[param.key] = template[param.key].astype(str)
-    template.loc[template['Task ID'] == task_id, param.key] = formula
-
-def insert_start_dates_length(task_id:str, param:AgeingParam, candidate, template):
-    startDates = candidate[param.start_dates]
-    lenght = len(startDates)
-    template.loc[template['Task ID'] == task_id, param.key] = lenght
-
-def insert_first_date_value(task_id:str, param:AgeingParam, candidate, template):
-    value = candidate[param.start_dates]
-    template[param.key] = template[param.key].astype(str)
-    template.loc[template['Task ID'] == task_id, param.key] = value[0] if len(value) != 0 else ""
-
-def insert_ageing_values(ageingCandidates, template:pd.DataFrame):
-    for task_id, candidate in ageingCandidates.items():
-        for param in ageing_params:
-            category = param.category
-            if category == Category.Length.value:
-                insert_start_dates_length(task_id, param, candidate, template)
-            elif category == Category.Value.value:
-                insert_first_date_value(task_id, param, candidate, template)
-            elif category == Category.Network.value:
-                insert_network_days_formula(task_id, param, candidate, template)
-
-def insert_label_values(template:pd.DataFrame):
-
-    # Continue Here it must be like what I did with parse_descriptions function
-    template_columns = template.columns.tolist()
-    template['Labels'] = template['Labels'].astype(str)
-    labels_column = template['Labels']
+    tasks, start_codes, end_codes = description_dates.get_intervals(param)
+    start_texts = description_dates.texts[start_codes]
+    end_texts = np.where(end_codes >= 0, description_dates.texts[end_codes], today)
+    if holidays is None:
+        end_dates = np.where(end_codes >= 0, description_dates.dates[end_codes], parse_dates([today])[0])
+        interval_holidays = get_intervals_holidays(get_business_calendar(), description_dates.dates[start_codes], end_dates)
+    else:
+        interval_holidays = [holidays] * len(tasks)
+
+    formulas = np.full(len(description_dates.task_ids), '=0', dtype=object)
+    if len(tasks):
+        # The terms of each task are summed in the order of its intervals
+        order = np.argsort(tasks, kind='stable')
+        tasks, start_texts, end_texts = tasks[order], start_texts[order], end_texts[order]
+        is_first = np.concatenate(([True], tasks[1:] != tasks[:-1]))
+        is_last = np.concatenate((tasks[1:] != tasks[:-1], [True]))
+        # The holidays are the long part of the formulas, they are copied once per interval with the end of the term
+        holiday_codes, holiday_literals = pd.factorize(np.asarray(interval_holidays, dtype=object)[order])
+        endings = np.array([[f'", {weekends}, {literal})', f'", {weekends}, {literal}))'] for literal in holiday_literals], dtype=object)
+        # Directly use start_date and end_date if they are already in mm/dd/yy format, the strings of all the intervals are added at once
+        starts = np.where(is_first, '=ABS(NETWORKDAYS.INTL("', '+NETWORKDAYS.INTL("').astype(object)
+        terms = starts + start_texts + '", "' + end_texts + endings[holiday_codes, is_last.astype(np.int64)]
+        formulas[tasks[is_first]] = np.add.reduceat(terms, np.flatnonzero(is_first))
+    return formulas.tolist()
+
+def get_intervals_holidays(calendar, start_dates: np.ndarray, end_dates: np.ndarray) -> np.ndarray:
+    """Array literal of the holidays of the years of every interval, from the earlier to the later of its two dates."""
+    start_years = np.where(np.isnat(start_dates), 0, start_dates.astype('datetime64[Y]').astype(np.int64) + 1970)
+    end_years = np.where(np.isnat(end_dates), 0, end_dates.astype('datetime64[Y]').astype(np.int64) + 1970)
+    # An invalid date takes the year of the other one, the intervals without any valid date get every year of the calendar
+    first_years = np.where(start_years == 0, end_years, np.where(end_years == 0, start_years, np.minimum(start_years, end_years)))
+    last_years = np.maximum(start_years, end_years)
+    # One key per pair of years, so the distinct pairs are found with a flat unique
+    year_pairs, inverse = np.unique(first_years * 10000 + last_years, return_inverse=True)
+    literals = np.array([calendar.get_holidays_literal(int(year_pair // 10000) or None, int(year_pair % 10000) or None) for year_pair in year_pairs], dtype=object)
+    return literals[inverse]
+
+def count_network_days(param: AgeingParam, description_dates: DescriptionDates, today: str) -> list:
+    """Compute ABS(NETWORKDAYS.INTL(...)+...) in Python for every task at once, tasks with an invalid date get ''."""
+    tasks, start_codes, end_codes = description_dates.get_intervals(param)
+    if len(tasks) == 0:
+        return [0] * len(description_dates.task_ids)
+    start_dates = description_dates.dates[start_codes]
+    end_dates = np.where(end_codes >= 0, description_dates.dates[end_codes], parse_dates([today])[0])
+    valid = ~(np.isnat(start_dates) | np.isnat(end_dates))
+
+    # NETWORKDAYS counts both ends of the interval and is negative when the start is after the end
+    first_dates = np.minimum(start_dates[valid], end_dates[valid])
+    last_dates = np.maximum(start_dates[valid], end_dates[valid])
+    days = np.zeros(len(tasks), dtype=np.int64)
+    days[valid] = get_business_calendar().count(first_dates, last_dates)
+    days[start_dates > end_dates] *= -1
+
+    number_of_tasks = len(description_dates.task_ids)
+    totals = np.abs(np.bincount(tasks, weights=days, minlength=number_of_tasks)).astype(np.int64)
+    invalid = np.bincount(tasks, weights=~valid, minlength=number_of_tasks) > 0
+    return ['' if is_invalid else int(total) for total, is_invalid in zip(totals, invalid)]
+
+def insert_ageing_values(description_dates: DescriptionDates, template:pd.DataFrame, ageing_output:str = ageing_output_mode, holidays_mode:str = holidays_formula_mode, stored_values: dict = None):
+    """Compute every ageing column of the tasks at once and assign it in bulk by Task ID, with the stored_values of a previous run."""
+    stored_values = stored_values or {}
+    if not len(description_dates) and not stored_values:
+        return
     task_ids = template['Task ID']
+    candidate_rows = task_ids.isin(description_dates.task_ids) | task_ids.isin(stored_values.keys())
+    candidate_task_ids = task_ids[candidate_rows]
+    today = datetime.now().strftime('%m/%d/%y')
+    holidays = holidays_name if holidays_mode == 'named' else None
+    task_ids_of_candidates = description_dates.task_ids
+
+    for param in ageing_params:
+        category = param.category
+        if category == Category.Length.value:
+            values = description_dates.get_lengths(param.start_dates).tolist()
+        elif category == Category.Value.value:
+            values = description_dates.get_first_texts(param.start_dates)
+            # Dates are stored as text
+            template[param.key] = template[param.key].astype(str)
+        elif category == Category.Network.value and ageing_output == 'values':
+            values = count_network_days(param, description_dates, today)
+        elif category == Category.Network.value:
+            values = get_network_days_formulas(param, description_dates, today, holidays)
+            # Formulas are stored as text
+            template[param.key] = template[param.key].astype(str)
+        values_by_task_id = dict(zip(task_ids_of_candidates, values))
+        values_by_task_id.update({task_id: values[param.key] for task_id, values in stored_values.items()})
+        template.loc[candidate_rows, param.key] = candidate_task_ids.map(values_by_task_id)
+
+def insert_label_values(template:pd.DataFrame, stored_labels: dict = None, return_labels: bool = False) -> dict:
+    """Set the label columns of each task to True, with the stored_labels of a previous run, and return them by Task ID if asked."""
+    stored_labels = stored_labels or {}
 
-    for task_id, labels_text in zip(task_ids, labels_column):
-        labels = [label.upper().strip() for label in labels_text.split(';')]
-        for label in labels:
-            if label in template_columns:
-                template.loc[template['Task ID'] == task_id, label] = True
+    template['Labels'] = template['Labels'].astype(str)
+    task_ids = template['Task ID'].reset_index(drop=True)
+    is_stored = task_ids.isin(stored_labels.keys())
+
+    # One row per label of each task, indexed by the position of the task
+    labels = template['Labels'].reset_index(drop=True)[~is_stored].str.split(';').explode().str.upper().str.strip()
+    labels = labels[labels.isin(template.columns)]
+    if stored_labels:
+        labels = pd.concat([labels, task_ids[is_stored].map(stored_labels).explode().dropna()]).sort_index(kind='stable')
+
+    # Indicator matrix of the labels of each Task ID, every row of the task gets them
+    if not labels.empty:
+        task_codes, _ = pd.factorize(task_ids)
+        label_codes, label_names = pd.factorize(labels)
+        indicator = np.zeros((task_codes.max() + 1, len(label_names)), dtype=bool)
+        indicator[task_codes[labels.index], label_codes] = True
+        row_indicator = indicator[task_codes]
+        for position, label in enumerate(label_names):
+            template.loc[row_indicator[:, position], label] = True
+
+    if not return_labels:
+        return None
+    # The labels of a repeated Task ID are the ones of its last row
+    labels_by_row = labels.groupby(level=0).agg(list)
+    last_rows = ~task_ids.duplicated(keep='last')
+    return {task_id: labels_by_row.get(position, []) for position, task_id in task_ids[last_rows].items()}
 
 def clean_not_candidates(df, task_ids):
     # Create a set of column names from the columns Enum
@@ -438,7 +597,7 @@ def clean_not_candidates(df, task_ids):
 
     return df
 
-def create_dashboard_report(source_file_path: str, destination_path: str, content: pd.DataFrame, new_file_name: str, lattest_report_dir: str, tasks_to_be_painted) -> str:
+def create_dashboard_report(source_file_path: str, destination_path: str, content: pd.DataFrame, new_file_name: str, lattest_report_dir: str, tasks_to_be_painted, holidays_array: str = None, summary_sheets: dict = None) -> str:
     # Generate the timestamp without invalid characters
     timestamp = datetime.now().strftime("%B %d, %Y %H-%M-%S")
     lattest_report_name = f"{new_file_name} {timestamp}.xlsx"
@@ -449,16 +608,24 @@ def create_dashboard_report(source_file_path: str, destination_path: str, conten
     # Copy the source file to the new destination
     shutil.copy2(source_file_path, new_file_path)  # Using copy2 to preserve metadata
     
+    # Imported here so the headless runs don't need Excel
+    import xlwings as xw
+
     # Open the workbook with xlwings (invisible)
     app = xw.App(visible=False)
+    wb = None
     try:
-        # Open the source file to determine the last column of the table
-        source_app = xw.App(visible=False)
-        source_wb = source_app.books.open(source_file_path)
-        source_sheet = source_wb.sheets['Tasks']
-        last_col_letter = get_last_column_letter(source_sheet, 'Tasks')
-        source_wb.close()
-        source_app.quit()
+        if template_cache:
+            # The last column of the table is known from the template metadata
+            last_col_letter = get_template_metadata(source_file_path)['last_column_letter']
+        else:
+            # Open the source file to determine the last column of the table
+            source_app = xw.App(visible=False)
+            source_wb = source_app.books.open(source_file_path)
+            source_sheet = source_wb.sheets['Tasks']
+            last_col_letter = get_last_column_letter(source_sheet, 'Tasks')
+            source_wb.close()
+            source_app.quit()
 
         # Now open the new workbook
         wb = app.books.open(new_file_path)
@@ -536,14 +703,20 @@ def create_dashboard_report(source_file_path: str, destination_path: str, conten
             # Assuming `sheet` is your sheet object, and `row` and `col` are the row and column positions
             sheet.range((row, col)).value = value
 
-        refresh_pivot_tables()
+        # Define the holidays once for the formulas that reference them by name
+        if holidays_array is not None:
+            wb.names.add(holidays_name, f"={holidays_array}")
+
+        if summary_sheets is not None:
+            write_summary_sheets_xlwings(wb, summary_sheets)
+        else:
+            refresh_pivot_tables()
         
         # Save and close the workbook
         wb.save()
-    except Exception as e:
-        print(f"An error occurred: {e}")
     finally:
-        wb.close()
+        if wb is not None:
+            wb.close()
         app.quit()
     
     # Copy the file to the latest report directory
@@ -552,7 +725,133 @@ def create_dashboard_report(source_file_path: str, destination_path: str, conten
     
     return lattest_report_path
 
+def get_rows_addresses(row_indexes, last_col_letter: str, max_length: int = 255) -> list:
+    """Group the rows into as few range addresses as possible, Excel doesn't accept addresses longer than max_length."""
+    blocks = []
+    for row_index in sorted(set(row_indexes)):
+        if blocks and blocks[-1][1] == row_index - 1:
+            blocks[-1][1] = row_index
+        else:
+            blocks.append([row_index, row_index])
+
+    addresses = []
+    address = ''
+    for first_row, last_row in blocks:
+        block = f"A{first_row}:{last_col_letter}{last_row}"
+        if address and len(address) + len(block) + 1 > max_length:
+            addresses.append(address)
+            address = ''
+        address = f"{address},{block}" if address else block
+    if address:
+        addresses.append(address)
+    return addresses
+
+def blank_nan_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """Replace the 'nan' strings left by astype(str) with empty strings."""
+    df = df.copy()
+    for column in df.columns[df.dtypes == object]:
+        is_nan_string = df[column].str.lower().eq('nan')
+        df.loc[is_nan_string, column] = ''
+    return df
+
+def create_dashboard_report_batched(source_file_path: str, destination_path: str, content: pd.DataFrame, new_file_name: str, lattest_report_dir: str, tasks_to_be_painted, holidays_array: str = None, summary_sheets: dict = None) -> str:
+    """Same as create_dashboard_report but with a few range-level reads and writes instead of one COM call per cell."""
+    # Generate the timestamp without invalid characters
+    timestamp = datetime.now().strftime("%B %d, %Y %H-%M-%S")
+    lattest_report_name = f"{new_file_name} {timestamp}.xlsx"
+    lattest_report_path = os.path.join(lattest_report_dir+'/Dashboard/', lattest_report_name)
+
+    new_file_path = os.path.join(destination_path, lattest_report_name)
+
+    # Copy the source file to the new destination
+    shutil.copy2(source_file_path, new_file_path)  # Using copy2 to preserve metadata
+
+    import xlwings as xw
+    app = xw.App(visible=False)
+    wb = None
+    try:
+        # Nothing is redrawn, no event handler runs and nothing is recalculated until the workbook is complete
+        app.screen_updating = False
+        app.enable_events = False
+        wb = app.books.open(new_file_path)
+        app.calculation = 'manual'
+
+        if 'Tasks' not in [s.name for s in wb.sheets]:
+            raise ValueError("The source file does not contain a sheet named 'Tasks'.")
+        sheet = wb.sheets['Tasks']
+
+        # Get the existing table in the sheet, the copy has the same columns as the source file
+        table_name = 'Tasks'
+        tables = [tbl for tbl in sheet.tables if tbl.name == table_name]
+        if not tables:
+            raise ValueError(f"The sheet 'Tasks' does not contain a table named '{table_name}'.")
+        table = tables[0]
+        last_col_letter = get_last_column_letter(sheet, table_name)
+
+        # Extract formulas from the first row of the table with a single read
+        table_range = table.data_body_range
+        first_row, first_col = table_range.row, table_range.column
+        body_formulas = table_range.formula
+        if isinstance(body_formulas, str):
+            body_formulas = ((body_formulas,),)
+        first_row_formulas = [(first_row + row_idx, first_col + col_idx, formula)
+                              for row_idx, row in enumerate(body_formulas)
+                              for col_idx, formula in enumerate(row) if '=' in formula]
+
+        # Find the first empty row in the table
+        last_row = sheet.range(f"A{sheet.cells.last_cell.row}").end('up').row
+        first_empty_row = last_row + 1
+
+        # Replace NaN values and 'nan' strings with empty strings before writing, instead of fixing the cells afterwards
+        content_cleaned = blank_nan_strings(content.where(pd.notna(content), ""))
+        sheet.range(f"A{first_empty_row}").value = content_cleaned.values
+
+        # Resize the table to include the new data
+        table.source_range = sheet.range(f"A1:{last_col_letter}{first_empty_row + content_cleaned.shape[0] - 1}")
+
+        # Paint the rows yellow if the Task ID is in tasks_to_be_painted, one call per block of up to 255 characters of addresses
+        tasks_to_be_painted = set(tasks_to_be_painted)
+        row_indexes_to_paint = [i + first_empty_row for i, task_id in enumerate(content['Task ID'].values) if task_id in tasks_to_be_painted]
+        yellow_color = (255, 255, 0)  # RGB value for yellow
+        for address in get_rows_addresses(row_indexes_to_paint, last_col_letter):
+            sheet.range(address).color = yellow_color
+
+        # Adjust first_empty_row for possible deletion
+        first_empty_row -= 1
+        # Delete the first empty row
+        if first_empty_row <= sheet.cells.last_cell.row:
+            sheet.range(f"{first_empty_row}:{first_empty_row}").api.Delete()
+
+        for row, col, value in first_row_formulas:
+            sheet.range((row, col)).value = value
+
+        # Define the holidays once for the formulas that reference them by name
+        if holidays_array is not None:
+            wb.names.add(holidays_name, f"={holidays_array}")
+
+        if summary_sheets is not None:
+            write_summary_sheets_xlwings(wb, summary_sheets)
+        # The pivot tables need the calculated columns
+        app.calculation = 'automatic'
+        if summary_sheets is None:
+            refresh_pivot_tables()
+
+        # Save and close the workbook
+        wb.save()
+    finally:
+        if wb is not None:
+            wb.close()
+        app.quit()
+
+    # Copy the file to the latest report directory
+    delete_all_files_in_folder(lattest_report_dir+'/Dashboard')
+    shutil.copy2(new_file_path, lattest_report_path)  # Using copy2 to preserve metadata
+
+    return lattest_report_path
+
 def refresh_pivot_tables():
+    import xlwings as xw
+
     # Get the active workbook
     wb = xw.books.active
     
@@ -567,71 +866,177 @@ def refresh_pivot_tables():
     # Re-enable alerts
     # xw.apps.active.api.DisplayAlerts = True
 
-def read_files(files_directory_path: str):
-    sites_dict = {}
-    boards_data_frames = []
-    financial_data_frame = pd.DataFrame()
-
+def read_files(files_directory_path: str, use_cache: bool = ingestion_cache):
     if not os.path.exists(files_directory_path):
-        print(f"The directory '{files_directory_path}' does not exist.")
-        return boards_data_frames,  sites_dict, financial_data_frame
+        raise FileNotFoundError(f"The directory '{files_directory_path}' does not exist.")
 
+    data_frames = {}
     for filename in os.listdir(files_directory_path):
         file_path = os.path.join(files_directory_path, filename)
 
         if os.path.isfile(file_path) and filename.endswith('.csv'):
-            try:
-                # Read the CSV file into a DataFrame with UTF-8 encoding
-                df = pd.read_csv(file_path, encoding='utf-8')
+            # Read the CSV file into a DataFrame with UTF-8 encoding
+            if use_cache:
+                data_frames[filename] = read_cached(file_path, read_csv_file, 'csv')
+            else:
+                data_frames[filename] = read_csv_file(file_path)
 
-                # Ensure column names are cleaned and set properly
-                if not df.empty:
-                    if set(required_headers).issubset(df.columns):
-                        if set(dashboard_required_headers).issubset(df.columns):
-                            # Extract Task IDs if available
-                            sites_dict[filename] = list(df['Task ID'].dropna().astype(str))
-                            df.columns = df.columns.str.strip()  # Clean column names
+    return classify_data_frames(data_frames)
 
-                            # Clean the 'Description' column if it exists
-                            if 'Description' in df.columns:
-                                df['Description'] = df['Description'].apply(clean_description)
+def read_csv_file(file_path: str) -> pd.DataFrame:
+    return clean_board_data_frame(pd.read_csv(file_path, encoding='utf-8'))
 
-                            boards_data_frames.append(df)    
-                        if set(financial_required_headers).issubset(df.columns):
-                            financial_data_frame = df
-                            financial_data_frame.fillna("")
+def get_csv_data_frames(data_frames: dict) -> dict:
+    """Pass the DataFrames through CSV in memory, so the memory ingestion gets the same values and types as the CSV one."""
+    return {file_name: read_csv_file(io.StringIO(df.to_csv(index=False))) for file_name, df in data_frames.items()}
 
-            except Exception as e:
-                print(f"Failed to read {filename}: {e}")
+def classify_data_frames(data_frames: dict):
+    """Split the files DataFrames, keyed by file name and already cleaned when they were read, into the boards, the Task IDs of each site and the financial data."""
+    sites_dict = {}
+    boards_data_frames = []
+    financial_data_frame = pd.DataFrame()
 
-    
+    for filename, df in data_frames.items():
+        # Ensure column names are cleaned and set properly
+        if not df.empty:
+            if set(required_headers).issubset(df.columns):
+                if set(dashboard_required_headers).issubset(df.columns):
+                    # Extract Task IDs if available
+                    sites_dict[filename] = list(df['Task ID'].dropna().astype(str))
+                    boards_data_frames.append(df)
+                if set(financial_required_headers).issubset(df.columns):
+                    financial_data_frame = df
+                    financial_data_frame.fillna("")
 
     return boards_data_frames, sites_dict, financial_data_frame
 
-def store_files(file_paths):
-    store_excel_as_csv(file_paths)
+def load_file(file_path: str, keep_snapshot: bool = keep_csv_snapshot, use_cache: bool = ingestion_cache):
+    """Read, validate and clean a single uploaded file, this is the work done by each ingestion worker."""
+    data_frames = read_excel_files([file_path], use_cache)
+    if keep_snapshot:
+        for file_name, df in data_frames.items():
+            store_data_frame_as_csv(file_name, df)
+    return classify_data_frames(get_csv_data_frames(data_frames))
 
-def create_financial_report(tasks_dataframe, financial_data_frame):
-    # Ensure you're working with a copy of the DataFrame slice
-    tasks_dataframe = tasks_dataframe[['Task ID', 'Task Name', 'Labels', 'Bucket Name', 'Site']].copy()
-    
-    size = tasks_dataframe['Task ID'].size
-    
-    # Use .loc to avoid the SettingWithCopyWarning and add empty columns
+def merge_loaded_files(loaded_files):
+    """Merge the result of load_file for each file, in the order of the files, as if they were classified together."""
+    sites_dict = {}
+    boards_data_frames = []
+    financial_data_frame = pd.DataFrame()
+    for file_boards, file_sites, file_financial in loaded_files:
+        boards_data_frames.extend(file_boards)
+        sites_dict.update(file_sites)
+        if not file_financial.empty:
+            financial_data_frame = file_financial
+    return boards_data_frames, sites_dict, financial_data_frame
+
+def load_files(file_paths, keep_snapshot: bool = keep_csv_snapshot, workers: int = 1, use_cache: bool = ingestion_cache):
+    """Read the uploaded files into memory, in a process pool with more than one worker, workers = None uses all the cores."""
+    file_paths = list(file_paths)
+    if workers == 1 or len(file_paths) <= 1:
+        data_frames = read_excel_files(file_paths, use_cache)
+        if keep_snapshot:
+            store_data_frames_as_csv(data_frames)
+        return classify_data_frames(get_csv_data_frames(data_frames))
+
+    if keep_snapshot:
+        clean_files_directory()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map keeps the order of the files, so the merge does not depend on which worker finishes first
+        loaded_files = list(executor.map(load_file, file_paths, [keep_snapshot] * len(file_paths), [use_cache] * len(file_paths)))
+    return merge_loaded_files(loaded_files)
+
+def store_files(file_paths, use_cache: bool = ingestion_cache):
+    store_excel_as_csv(file_paths, use_cache)
+
+def merge_financial_data(tasks_dataframe: pd.DataFrame, financial_data_frame: pd.DataFrame, logger: Logger) -> pd.DataFrame:
+    """Join the invoice columns to the tasks by Task ID, the tasks without invoice get empty cells."""
+    if financial_data_frame.empty or 'Task ID' not in financial_data_frame.columns:
+        return tasks_dataframe.assign(**{column: '' for column in financial_required_headers})
+
+    invoices = financial_data_frame[['Task ID'] + financial_required_headers]
+    task_names = dict(zip(tasks_dataframe['Task ID'], tasks_dataframe['Task Name']))
+    task_sites = dict(zip(tasks_dataframe['Task ID'], tasks_dataframe['Site']))
+
+    # Invoices of tasks that are not in the boards can't be reported
+    unknown_invoices = ~invoices['Task ID'].isin(task_names.keys())
+    for task_id, count in invoices.loc[unknown_invoices, 'Task ID'].value_counts(dropna=False, sort=False).items():
+        logger.WARNING('', task_id, '', '', f"{count} invoice row(s) with a Task ID that is not in the boards, they are not in the financial report")
+
+    # When a Task ID has more than one invoice row the last one is used
+    invoices = invoices[~unknown_invoices]
+    repeated_invoices = invoices['Task ID'].value_counts(sort=False)
+    for task_id, count in repeated_invoices[repeated_invoices > 1].items():
+        logger.WARNING('', task_id, task_names[task_id], task_sites[task_id], f"The Task ID has {count} invoice rows, only the last one is used in the financial report")
+    invoices = invoices.drop_duplicates('Task ID', keep='last').set_index('Task ID')
+
+    merged = tasks_dataframe.join(invoices, on='Task ID')
+    has_invoice = merged['Task ID'].isin(invoices.index)
     for column in financial_required_headers:
-        tasks_dataframe.loc[:, column] = [''] * size
-    
-    # Update financial data into tasks_dataframe based on 'Task ID'
-    for index, row in financial_data_frame.iterrows():
-        task_id = row['Task ID']
-        for column in financial_required_headers:
-            value = row[column]
-            tasks_dataframe.loc[tasks_dataframe['Task ID'] == task_id, column] = value
+        merged[column] = merged[column].astype(object).where(has_invoice, '')
+    return merged
+
+def get_column_widths(df: pd.DataFrame) -> list:
+    """Return the width of each column, the length of its longest value or header as text plus some padding."""
+    widths = []
+    for column in df.columns:
+        values = df[column]
+        lengths = values[values.notna()].astype(str).str.len()
+        max_length = max(len(str(column)), int(lengths.max()) if not lengths.empty else 0)
+        widths.append(max_length + 2)  # Add some padding
+    return widths
+
+def write_financial_report_streaming(tasks_dataframe: pd.DataFrame, file_path: str):
+    """Write the financial report in one pass, with its table, style and column widths, without loading it back."""
+    from openpyxl import Workbook
+    from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+    from openpyxl.worksheet.filters import AutoFilter
+    from openpyxl.utils import get_column_letter
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+
+    # Column widths must be set before the rows are written
+    for col_index, width in enumerate(get_column_widths(tasks_dataframe), start=1):
+        ws.column_dimensions[get_column_letter(col_index)].width = width
+
+    headers = [str(column) for column in tasks_dataframe.columns]
+    ws.append(headers)
+    for values in tasks_dataframe.itertuples(index=False, name=None):
+        # Empty cells for NaN and empty strings, like to_excel
+        ws.append([None if value is None or value != value or value == '' else value for value in values])
+
+    num_rows = tasks_dataframe.shape[0] + 1  # Number of rows including header
+    table = Table(displayName="FinancialTable", ref=f"A1:{get_column_letter(len(headers))}{num_rows}")
+    # Write-only worksheets don't read the header cells back, the table columns and the filter are added here
+    table.tableColumns = [TableColumn(id=column_id, name=header) for column_id, header in enumerate(headers, start=1)]
+    table.autoFilter = AutoFilter(ref=table.ref)
+    table.tableStyleInfo = TableStyleInfo(
+        name="TableStyleMedium9", showFirstColumn=False,
+        showLastColumn=False, showRowStripes=True, showColumnStripes=True
+    )
+    with warnings.catch_warnings():
+        # openpyxl warns on every table of a write-only worksheet, the columns are already set
+        warnings.filterwarnings('ignore', message="In write-only mode you must add table columns manually")
+        ws.add_table(table)
+
+    wb.save(file_path)
+
+def create_financial_report(tasks_dataframe, financial_data_frame, writer = financial_writer, lattest_report_dir = lattest_report_path, logger: Logger = None):
+    from openpyxl import load_workbook
+    from openpyxl.worksheet.table import Table, TableStyleInfo
+    from openpyxl.utils import get_column_letter
+    logger = logger or Logger()
+    tasks_dataframe = tasks_dataframe[['Task ID', 'Task Name', 'Labels', 'Bucket Name', 'Site']]
+    tasks_dataframe = merge_financial_data(tasks_dataframe, financial_data_frame, logger)
 
     # Handle file deletion and Excel export
-    delete_all_files_in_folder(lattest_report_path + '/Financial')
+    delete_all_files_in_folder(lattest_report_dir + '/Financial')
     timestamp = datetime.now().strftime("%B %d, %Y %H-%M-%S")
-    lattest_report_name = f"{lattest_report_path}/Financial/{financial_new_file_name} {timestamp}.xlsx"
+    lattest_report_name = f"{lattest_report_dir}/Financial/{financial_new_file_name} {timestamp}.xlsx"
+
+    if writer == 'streaming':
+        write_financial_report_streaming(tasks_dataframe, lattest_report_name)
+        return
     
     # Save the DataFrame to Excel, excluding the index column
     tasks_dataframe.to_excel(lattest_report_name, engine='openpyxl', index=False)
@@ -676,48 +1081,179 @@ def create_financial_report(tasks_dataframe, financial_data_frame):
     # Save the updated workbook
     wb.save(lattest_report_name)
 
-def get_tasks_data(data_frames, sites_dict, do_financial, do_dashboard, analyze_descriptions_only):
-    template = read_excel_file(template_path)
-    combined_dataframes = combine_dataframes(data_frames)
-    template = move_files_info_to_template(combined_dataframes,template)
-    template = assign_sites(template,sites_dict)
+def get_tasks_data(data_frames, sites_dict, do_financial, do_dashboard, analyze_descriptions_only, ageing_output = ageing_output_mode, holidays_mode = holidays_formula_mode, incremental = incremental_mode, logger: Logger = None, profiler: RunProfiler = None):
+    profiler = profiler or RunProfiler(enabled=False)
+    with profiler.stage('prepare_template'):
+        template = get_template()
+        combined_dataframes = combine_dataframes(data_frames)
+        template = move_files_info_to_template(combined_dataframes,template)
+        template = assign_sites(template,sites_dict)
+    profiler.add_rows('prepare_template', len(template))
     if do_financial and not do_dashboard:
         return template, []
-    logger = Logger()
-    descriptions = parse_descriptions(template, logger)
+    if incremental:
+        return get_tasks_data_incremental(template, analyze_descriptions_only, ageing_output, holidays_mode, logger=logger, profiler=profiler)
+    logger = logger or Logger()
+    with profiler.stage('parse_descriptions'):
+        descriptions = parse_descriptions(template, logger)
+    profiler.add_rows('parse_descriptions', len(template))
     if(analyze_descriptions_only):
         logger.save_to_file()
         return [],[]
     tasks_to_be_ignored = logger.get_tasks_ids()
     clean_not_candidates(template, tasks_to_be_ignored)
-    ageing_candidates = {key: value for key, value in descriptions.items() if key not in tasks_to_be_ignored}
-    insert_ageing_values(ageing_candidates, template)
-    insert_label_values(template)
+    ageing_candidates = descriptions.select([not logger.is_flagged(task_id) for task_id in descriptions.task_ids])
+    with profiler.stage('insert_ageing_values'):
+        insert_ageing_values(ageing_candidates, template, ageing_output, holidays_mode)
+    profiler.add_rows('insert_ageing_values', len(ageing_candidates))
+    with profiler.stage('insert_label_values'):
+        insert_label_values(template)
+    profiler.add_rows('insert_label_values', len(template))
     logger.save_to_file()
     return template, tasks_to_be_ignored
 
-def excecute(file_paths = None, checkboxes = None):
-    if file_paths is not None:
-        store_files(file_paths)
+def get_tasks_data_incremental(template: pd.DataFrame, analyze_descriptions_only, ageing_output = ageing_output_mode, holidays_mode = holidays_formula_mode, full_rebuild = False, logger: Logger = None, profiler: RunProfiler = None):
+    """Same as get_tasks_data, but the tasks that did not change since the last run reuse its results, full_rebuild ignores them."""
+    logger = logger or Logger()
+    profiler = profiler or RunProfiler(enabled=False)
+    state = None if full_rebuild else load_state()
+    # The stored dates are indexed by the position of their key
+    if state is not None and state['descriptions']['keys'] != desc_keys_values:
+        state = None
+    stored_tasks = state['tasks'] if state is not None else {}
+    fingerprints = get_fingerprints(template)
+    reusable_rows = get_reusable_rows(template, fingerprints, state)
+    reusable_task_ids = set(template.loc[reusable_rows, 'Task ID'])
+
+    # Parse only the new and changed descriptions, the diagnostics of the others are logged again as they were
+    with profiler.stage('parse_descriptions'):
+        descriptions = parse_descriptions(template[~reusable_rows], logger)
+    profiler.add_rows('parse_descriptions', int((~reusable_rows).sum()))
+    reusable_tasks = template.loc[reusable_rows, ['Task ID', 'Task Name', 'Site']]
+    for task_id, task_name, site in zip(reusable_tasks['Task ID'], reusable_tasks['Task Name'], reusable_tasks['Site']):
+        for level_name, line, issue_description in stored_tasks[task_id]['messages']:
+            getattr(logger, level_name)(line, task_id, task_name, site, issue_description)
+    if state is not None:
+        stored_descriptions = DescriptionDates(**state['descriptions'])
+        descriptions = DescriptionDates.concat([descriptions, stored_descriptions.select(pd.Series(stored_descriptions.task_ids).isin(reusable_task_ids))])
+    # Keep the log in the same order as a full run
+    logger.sort_by_task_ids(template['Task ID'])
+
+    # Ageing values and labels can only be reused when they were computed the same way
+    context = {
+        'today': datetime.now().strftime('%m/%d/%y'),
+        'holidays': get_holidays_range(),
+        'ageing_output': ageing_output,
+        'holidays_mode': holidays_mode,
+        'columns': tuple(template.columns),
+    }
+    same_context = state is not None and state['context'] == context
+
+    ageing_values = {}
+    labels_by_task_id = {}
+    tasks_to_be_ignored = []
+    if not analyze_descriptions_only:
+        tasks_to_be_ignored = logger.get_tasks_ids()
+        clean_not_candidates(template, tasks_to_be_ignored)
+        ageing_candidates = descriptions.select([not logger.is_flagged(task_id) for task_id in descriptions.task_ids])
+
+        stored_values = {}
+        stored_labels = {}
+        if same_context:
+            stored_values = {task_id: stored_tasks[task_id]['ageing'] for task_id in ageing_candidates.task_ids if task_id in reusable_task_ids and stored_tasks[task_id]['ageing'] is not None}
+            stored_labels = {task_id: stored_tasks[task_id]['labels'] for task_id in reusable_task_ids if stored_tasks[task_id]['labels'] is not None}
+        changed_candidates = ageing_candidates.select(~pd.Series(ageing_candidates.task_ids).isin(stored_values.keys()))
+        with profiler.stage('insert_ageing_values'):
+            insert_ageing_values(changed_candidates, template, ageing_output, holidays_mode, stored_values)
+        profiler.add_rows('insert_ageing_values', len(changed_candidates))
+        with profiler.stage('insert_label_values'):
+            labels_by_task_id = insert_label_values(template, stored_labels, return_labels=True)
+        profiler.add_rows('insert_label_values', len(template) - len(stored_labels))
+
+        ageing_columns = [param.key for param in ageing_params]
+        candidate_rows = template[template['Task ID'].isin(ageing_candidates.task_ids)].drop_duplicates('Task ID', keep='last')
+        ageing_values = candidate_rows.set_index('Task ID')[ageing_columns].to_dict('index')
+
+    with profiler.stage('save_incremental_state'):
+        tasks = {}
+        for task_id, fingerprint in zip(template['Task ID'], fingerprints):
+            tasks[task_id] = {
+                'fingerprint': int(fingerprint),
+                'messages': logger.get_task_messages(task_id),
+                'ageing': ageing_values.get(task_id),
+                'labels': labels_by_task_id.get(task_id),
+            }
+        save_state(tasks, context, descriptions.get_state())
+    profiler.add_rows('save_incremental_state', len(tasks))
+
+    logger.save_to_file()
+    if analyze_descriptions_only:
+        return [],[]
+    return template, tasks_to_be_ignored
+
+def excecute(file_paths = None, checkboxes = None, engine = dashboard_engine, ageing_output = ageing_output_mode, holidays_mode = holidays_formula_mode, ingestion = ingestion_mode, use_cache = ingestion_cache, incremental = incremental_mode, writer = financial_writer, summaries = dashboard_summaries, reports_dir = reports_path, lattest_report_dir = lattest_report_path, log_path = log_file_path):
+    # The summaries count the ageing days, the formulas are only counted by Excel
+    if summaries == 'static' and ageing_output != 'values':
+        raise ValueError("The static summaries need the ageing days, set ageing_output_mode to 'values' or dashboard_summaries to 'pivot'.")
+    in_memory = file_paths is not None and ingestion in ('memory', 'parallel')
+    profiler = RunProfiler()
+    if file_paths is not None and not in_memory:
+        with profiler.stage('store_files'):
+            store_files(file_paths, use_cache)
     if checkboxes is None:
         checkboxes = (True, False, False)
 
     do_financial,do_dashboard, analyze_descriptions_only = checkboxes
 
     print("Getting the information from the files...")
-    boards_data_frames, sites_dict, financial_data_frame = read_files(files_directory_path)
-    tasks_dataframe, tasks_to_be_ignored = get_tasks_data(boards_data_frames, sites_dict, do_financial, do_dashboard, analyze_descriptions_only)
-    if not analyze_descriptions_only:
-        if do_dashboard:
-            print("Creating dashboard report...")
-            create_dashboard_report(template_path, reports_path, tasks_dataframe, new_file_name, lattest_report_path, tasks_to_be_ignored)
-        if do_financial:
-            print("Creating financial report...")
-            create_financial_report(tasks_dataframe, financial_data_frame)
-
-        print("Reports generated successfully!")
-    else:
-        print("Analysis generated successfully!")
+    with profiler.stage('read_files'):
+        if in_memory:
+            workers = ingestion_workers if ingestion == 'parallel' else 1
+            boards_data_frames, sites_dict, financial_data_frame = load_files(file_paths, workers=workers, use_cache=use_cache)
+        else:
+            boards_data_frames, sites_dict, financial_data_frame = read_files(files_directory_path, use_cache)
+    profiler.add_rows('read_files', sum(len(data_frame) for data_frame in boards_data_frames))
+    # The diagnostics of this run only, written to the log by every step
+    logger = Logger(log_path=log_path)
+    try:
+        tasks_dataframe, tasks_to_be_ignored = get_tasks_data(boards_data_frames, sites_dict, do_financial, do_dashboard, analyze_descriptions_only, ageing_output, holidays_mode, incremental, logger=logger, profiler=profiler)
+        if not analyze_descriptions_only:
+            if do_dashboard:
+                print("Creating dashboard report...")
+                holidays_array = get_holidays_range() if holidays_mode == 'named' else None
+                summary_sheets = None
+                if summaries == 'static':
+                    with profiler.stage('summaries'):
+                        summary_sheets = get_summary_sheets(tasks_dataframe, get_template_metadata()['pivot_tables'])
+                    profiler.add_rows('summaries', len(tasks_dataframe))
+                with profiler.stage('create_dashboard_report'):
+                    if engine == 'headless':
+                        from Headless import create_dashboard_report_headless
+                        create_dashboard_report_headless(template_path, reports_dir, tasks_dataframe, new_file_name, lattest_report_dir, tasks_to_be_ignored, holidays_array, summary_sheets)
+                    elif engine == 'batched':
+                        create_dashboard_report_batched(template_path, reports_dir, tasks_dataframe, new_file_name, lattest_report_dir, tasks_to_be_ignored, holidays_array, summary_sheets)
+                    else:
+                        create_dashboard_report(template_path, reports_dir, tasks_dataframe, new_file_name, lattest_report_dir, tasks_to_be_ignored, holidays_array, summary_sheets)
+                profiler.add_rows('create_dashboard_report', len(tasks_dataframe))
+            if do_financial:
+                print("Creating financial report...")
+                with profiler.stage('create_financial_report'):
+                    create_financial_report(tasks_dataframe, financial_data_frame, writer, lattest_report_dir, logger)
+                profiler.add_rows('create_financial_report', len(financial_data_frame))
+                # The invoice warnings are added to the log of the dashboard, a financial-only run keeps the log of the last analysis
+                if do_dashboard:
+                    logger.save_to_file()
+
+            print("Reports generated successfully!")
+        else:
+            print("Analysis generated successfully!")
+        if profiler.enabled:
+            logger.add_summary(profiler.get_summary())
+            logger.save_to_file()
+            print(profiler.get_summary())
+    finally:
+        # The structured files are closed even when a step fails
+        logger.close()
     
 
 if __name__ == '__main__':
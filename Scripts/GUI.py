@@ -1,7 +1,6 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from threading import Thread
-import Custom as Custom
 from variables import lattest_report_path, new_file_name, financial_new_file_name
 import os
 import subprocess
@@ -114,6 +113,17 @@ class ExcelUploaderApp:
 
         self.root.protocol("WM_DELETE_WINDOW", self.quit_application)
 
+        # The window shows first, the report modules and the holidays load in the background while the files are picked
+        self.root.after(0, lambda: Thread(target=self.preload, daemon=True).start())
+
+    def preload(self):
+        try:
+            import Custom
+            Custom.warm_up()
+        except Exception as e:
+            # The run imports it again and shows the error
+            print(f"Error preloading the report modules: {e}")
+
     def toggle_checkboxes(self):
         if self.analyze_descriptions_only_var.get():
             # If Analyze Descriptions Only is checked, disable and uncheck other checkboxes
@@ -156,6 +166,8 @@ class ExcelUploaderApp:
             analyzed_descriptions_only = self.analyze_descriptions_only_var.get()
 
             try:
+                # Already loaded by preload unless the files were picked before it finished
+                import Custom
                 Custom.excecute(file_paths, (do_financial, do_dashboard, analyzed_descriptions_only))
                 self.root.after(0, self.show_end_screen)
             except Exception as e:
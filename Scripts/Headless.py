@@ -0,0 +1,137 @@
+import os
+import re
+import shutil
+import warnings
+from datetime import datetime
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import PatternFill
+from openpyxl.workbook.defined_name import DefinedName
+from openpyxl.worksheet.formula import ArrayFormula
+from openpyxl.utils import get_column_letter, range_boundaries
+from Utils import delete_all_files_in_folder, get_four_digit_year
+from variables import holidays_name
+from Summary import write_summary_sheets
+from TemplateParts import restore_template_parts
+
+# Strings that Excel turns into numbers or dates when they are written through COM
+numeric_string_regex = re.compile(r'^-?\d+(\.\d+)?$')
+date_string_regex = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})$')
+
+def coerce_excel_value(value):
+    """Convert a cell value the same way Excel does when xlwings writes it, so both engines produce the same cells."""
+    if not isinstance(value, str):
+        return value
+    if value.lower() == 'nan':
+        return ''
+    if numeric_string_regex.match(value):
+        number = float(value)
+        return int(number) if number.is_integer() and '.' not in value else number
+    date_match = date_string_regex.match(value)
+    if date_match:
+        month, day, year = map(int, date_match.groups())
+        try:
+            return datetime(get_four_digit_year(year), month, day)
+        except ValueError:
+            return value
+    return value
+
+def get_first_row_formulas(sheet, first_row: int, last_col: int) -> dict:
+    """Collect the formulas of the first data row of the table, keyed by column index."""
+    first_row_formulas = {}
+    for col in range(1, last_col + 1):
+        value = sheet.cell(row=first_row, column=col).value
+        if isinstance(value, ArrayFormula) or (isinstance(value, str) and value.startswith('=')):
+            first_row_formulas[col] = value
+    return first_row_formulas
+
+def copy_formula(formula, coordinate: str):
+    """Return the formula to be written on another row of the table."""
+    if isinstance(formula, ArrayFormula):
+        return ArrayFormula(ref=coordinate, text=formula.text)
+    return formula
+
+def create_dashboard_report_headless(source_file_path: str, destination_path: str, content: pd.DataFrame, new_file_name: str, lattest_report_dir: str, tasks_to_be_painted, holidays_array: str = None, summary_sheets: dict = None) -> str:
+    """Same as Custom.create_dashboard_report but written with openpyxl, without an Excel instance."""
+    # Generate the timestamp without invalid characters
+    timestamp = datetime.now().strftime("%B %d, %Y %H-%M-%S")
+    lattest_report_name = f"{new_file_name} {timestamp}.xlsx"
+    lattest_report_path = os.path.join(lattest_report_dir+'/Dashboard/', lattest_report_name)
+
+    new_file_path = os.path.join(destination_path, lattest_report_name)
+
+    with warnings.catch_warnings():
+        # Slicers are not supported by openpyxl, they are copied back from the template after the save
+        warnings.simplefilter('ignore', UserWarning)
+        wb = load_workbook(source_file_path)
+    if 'Tasks' not in wb.sheetnames:
+        raise ValueError("The source file does not contain a sheet named 'Tasks'.")
+    sheet = wb['Tasks']
+
+    # Get the existing table in the sheet
+    table_name = 'Tasks'
+    if table_name not in sheet.tables:
+        raise ValueError(f"The sheet 'Tasks' does not contain a table named '{table_name}'.")
+    table = sheet.tables[table_name]
+
+    first_col, header_row, last_col, _ = range_boundaries(table.ref)
+    last_col_letter = get_column_letter(last_col)
+    first_row = header_row + 1
+
+    # Extract formulas from the first row of the table
+    first_row_formulas = get_first_row_formulas(sheet, first_row, last_col)
+
+    # Replace NaN values with empty strings
+    content_cleaned = content.where(pd.notna(content), "")
+    number_of_rows = max(content_cleaned.shape[0], 1)
+    last_row = first_row + number_of_rows - 1
+
+    # Write the cleaned content to the table starting from its first row
+    for row_index, values in enumerate(content_cleaned.itertuples(index=False, name=None), start=first_row):
+        for col_index, value in enumerate(values, start=first_col):
+            cell = sheet.cell(row=row_index, column=col_index)
+            cell.value = coerce_excel_value(value)
+            if isinstance(cell.value, datetime):
+                cell.number_format = 'mm/dd/yy'
+
+    # Copy the first row formulas down to every row of the table
+    for col, formula in first_row_formulas.items():
+        col_letter = get_column_letter(col)
+        for row_index in range(first_row, last_row + 1):
+            sheet.cell(row=row_index, column=col).value = copy_formula(formula, f"{col_letter}{row_index}")
+
+    # Resize the table to include the new data
+    table.ref = f"{get_column_letter(first_col)}{header_row}:{last_col_letter}{last_row}"
+    if table.autoFilter is not None:
+        table.autoFilter.ref = table.ref
+
+    # Paint the rows yellow if the Task ID is in tasks_to_be_painted
+    yellow_fill = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
+    tasks_to_be_painted = set(tasks_to_be_painted)
+    for row_index, task_id in enumerate(content['Task ID'].values, start=first_row):
+        if task_id in tasks_to_be_painted:
+            for row in sheet[f"{get_column_letter(first_col)}{row_index}:{last_col_letter}{row_index}"]:
+                for cell in row:
+                    cell.fill = yellow_fill
+
+    # Define the holidays once for the formulas that reference them by name
+    if holidays_array is not None:
+        wb.defined_names[holidays_name] = DefinedName(holidays_name, attr_text=holidays_array)
+
+    # Static copies of the pivot tables, readable without Excel
+    if summary_sheets is not None:
+        write_summary_sheets(wb, summary_sheets)
+
+    # Pivot tables can't be refreshed without Excel, ask Excel to do it when the file is opened
+    for worksheet in wb.worksheets:
+        for pivot in worksheet._pivots:
+            pivot.cache.refreshOnLoad = True
+
+    wb.save(new_file_path)
+    restore_template_parts(source_file_path, new_file_path)
+
+    # Copy the file to the latest report directory
+    delete_all_files_in_folder(lattest_report_dir+'/Dashboard')
+    shutil.copy2(new_file_path, lattest_report_path)  # Using copy2 to preserve metadata
+
+    return lattest_report_path
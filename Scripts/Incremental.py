@@ -0,0 +1,50 @@
+import os
+import pickle
+import pandas as pd
+from variables import incremental_state_path
+
+# Bump it when the stored results change shape, old states are then ignored and the next run is a full rebuild
+state_version = 2
+fingerprint_columns = ['Task ID', 'Description', 'Labels', 'Bucket Name']
+
+def get_fingerprints(template: pd.DataFrame) -> pd.Series:
+    """Hash the Task ID, Description, Labels and Bucket Name of every task."""
+    return pd.util.hash_pandas_object(template[fingerprint_columns].astype(str), index=False)
+
+def get_reusable_rows(template: pd.DataFrame, fingerprints: pd.Series, state: dict) -> pd.Series:
+    """Return a mask of the tasks that did not change since the run that stored the state."""
+    if state is None:
+        return pd.Series(False, index=template.index)
+    stored_fingerprints = {task_id: task['fingerprint'] for task_id, task in state['tasks'].items()}
+    previous_fingerprints = template['Task ID'].map(stored_fingerprints)
+    # Repeated Task IDs are always processed again, the state only keeps one of them
+    return (previous_fingerprints == fingerprints) & ~template['Task ID'].duplicated(keep=False)
+
+def load_state(path: str = incremental_state_path) -> dict:
+    """Return the state of the last run, or None when there is no usable state and a full rebuild is needed."""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"Failed to read the incremental state, doing a full rebuild: {e}")
+        return None
+    if not isinstance(state, dict) or state.get('version') != state_version:
+        return None
+    return state
+
+def save_state(tasks: dict, context: dict, descriptions: dict, path: str = incremental_state_path):
+    """Store the results of this run for the next one, descriptions has the arrays of the parsed description dates."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'wb') as f:
+        pickle.dump({'version': state_version, 'context': context, 'tasks': tasks, 'descriptions': descriptions}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+def delete_state(path: str = incremental_state_path):
+    """Forget the last run, so the next incremental run is a full rebuild."""
+    if os.path.isfile(path):
+        os.remove(path)
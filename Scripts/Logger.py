@@ -1,89 +1,187 @@
-from variables import log_file_path
+import csv
+import json
+import os
+import threading
+from variables import log_file_path, log_formats
 from Utils import delete_all_files_in_folder
 
+# Fields of every record, in the order of the CSV columns
+record_fields = ['sequence', 'level', 'task_id', 'task_name', 'site', 'line', 'description']
+
+class JsonLinesSink:
+    """Write every record as soon as it is logged, one JSON object per line."""
+    def __init__(self, path: str):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record, default=str) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class CsvSink:
+    """Write every record as soon as it is logged, one CSV row per record."""
+    def __init__(self, path: str):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=record_fields)
+        self.writer.writeheader()
+
+    def write(self, record: dict):
+        self.writer.writerow(record)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+sink_types = {'jsonl': JsonLinesSink, 'csv': CsvSink}
+
+def get_sink_path(log_path: str, log_format: str) -> str:
+    """The structured copy of a log sits next to it, result.log is copied to result.jsonl and result.csv."""
+    return f"{os.path.splitext(log_path)[0]}.{log_format}"
+
 class Logger:
-    INFO = 'INFO'
-    WARNING = 'WARNING'
-    ERROR = 'ERROR'
-
-    # Class-level attribute to store messages
-    messages_by_task_id = {}
-
-    @classmethod
-    def initialize_class_attributes(cls):
-        """Initialize or reset class-level attributes."""
-        cls.messages_by_task_id = {cls.INFO: {}, cls.WARNING: {}, cls.ERROR: {}}
-
-    @classmethod
-    def log(cls, level: str, line: str, task_id: str, task_name: str, site: str, issue_description: str):
-        """Format and log a message into the internal dictionary, grouped by Task ID and log level."""
-        if level not in cls.messages_by_task_id:
+    LEVELS = ['ERROR', 'INFO', 'WARNING']
+
+    def __init__(self, log_path: str = log_file_path, formats: list = None):
+        """Collect the diagnostics of one run, several threads can log to it at the same time.
+        log_path is where save_to_file writes the log, formats the structured copies streamed while the records are logged."""
+        self.log_path = log_path
+        self.formats = log_formats if formats is None else formats
+        self.lock = threading.Lock()
+        self.records = []
+        self.records_by_task_id = {}
+        self.records_by_site = {}
+        self.records_by_level = {level: [] for level in self.LEVELS}
+        self.flagged_task_ids = set()
+        self.summaries = []
+        # The structured files are started with the run, so a run without records doesn't leave the ones of the previous run
+        self.sinks = [sink_types[log_format](get_sink_path(self.log_path, log_format)) for log_format in self.formats]
+
+    def close(self):
+        """Close the structured files."""
+        with self.lock:
+            for sink in self.sinks:
+                sink.close()
+            self.sinks = []
+
+    def index_record(self, record: dict):
+        self.records_by_task_id.setdefault(record['task_id'], []).append(record)
+        self.records_by_site.setdefault(record['site'], []).append(record)
+        self.records_by_level[record['level']].append(record)
+        self.flagged_task_ids.add(record['task_id'])
+
+    def log(self, level: str, line: str, task_id: str, task_name: str, site: str, issue_description: str):
+        """Record a message, index it by Task ID, Site and level and stream it to the structured files."""
+        if level not in self.records_by_level:
             raise ValueError(f"Unsupported log level: {level}")
-        
-        if task_id not in cls.messages_by_task_id[level]:
-            cls.messages_by_task_id[level][task_id] = {
+
+        with self.lock:
+            record = {
+                'sequence': len(self.records),
+                'level': level,
+                'task_id': task_id,
                 'task_name': task_name,
-                'line': line,
                 'site': site,
-                'issues': []
+                'line': line,
+                'description': issue_description,
             }
-        # Append the issue description to the list for the given Task ID
-        cls.messages_by_task_id[level][task_id]['issues'].append({'line': line, 'description': issue_description})
+            self.records.append(record)
+            self.index_record(record)
+            for sink in self.sinks:
+                sink.write(record)
 
-    @classmethod
-    def INFO(cls, line: str, task_id: str, task_name: str, site: str, issue_description: str):
+    def INFO(self, line: str, task_id: str, task_name: str, site: str, issue_description: str):
         """Log a message with INFO level."""
-        cls.log(cls.INFO, line, task_id, task_name, site, issue_description)
+        self.log('INFO', line, task_id, task_name, site, issue_description)
 
-    @classmethod
-    def WARNING(cls, line: str, task_id: str, task_name: str, site: str, issue_description: str):
+    def WARNING(self, line: str, task_id: str, task_name: str, site: str, issue_description: str):
         """Log a message with WARNING level."""
-        cls.log(cls.WARNING, line, task_id, task_name, site, issue_description)
+        self.log('WARNING', line, task_id, task_name, site, issue_description)
 
-    @classmethod
-    def ERROR(cls, line: str, task_id: str, task_name: str, site: str, issue_description: str):
+    def ERROR(self, line: str, task_id: str, task_name: str, site: str, issue_description: str):
         """Log a message with ERROR level."""
-        cls.log(cls.ERROR, line, task_id, task_name, site, issue_description)
+        self.log('ERROR', line, task_id, task_name, site, issue_description)
+
+    def get_records(self, task_id: str = None, site: str = None, level: str = None) -> list:
+        """Return the records of a Task ID, Site and level, any of them can be left out."""
+        with self.lock:
+            candidates = self.records
+            if task_id is not None:
+                candidates = self.records_by_task_id.get(task_id, [])
+            elif site is not None:
+                candidates = self.records_by_site.get(site, [])
+            elif level is not None:
+                candidates = self.records_by_level.get(level, [])
+            return [record for record in candidates
+                    if (task_id is None or record['task_id'] == task_id)
+                    and (site is None or record['site'] == site)
+                    and (level is None or record['level'] == level)]
 
-    @classmethod
-    def get_messages(cls) -> dict:
+    def get_messages(self) -> dict:
         """Return the dictionary of messages grouped by log level and Task ID."""
-        return cls.messages_by_task_id
-
-    @classmethod
-    def save_to_file(cls, filename: str = log_file_path):
-        """Save all logged messages to a file, grouped by log level and Task ID, with overwriting."""
-        content = ""
-        # Define the order of log levels
-        log_levels = [cls.ERROR, cls.INFO, cls.WARNING]
-
-        # Iterate through each log level in the specified order
-        for level in log_levels:
-            if cls.messages_by_task_id[level]:
-                content += f"Log Level: {level}\n"
-                for task_id, details in cls.messages_by_task_id[level].items():
-                    content += f"Task ID: {task_id}\n"
-                    content += f"Task Name: {details['task_name']}\n"
-                    content += f"Site: {details['site']}\n"
+        messages_by_task_id = {level: {} for level in self.LEVELS}
+        for record in self.get_records():
+            tasks = messages_by_task_id[record['level']]
+            if record['task_id'] not in tasks:
+                tasks[record['task_id']] = {
+                    'task_name': record['task_name'],
+                    'line': record['line'],
+                    'site': record['site'],
+                    'issues': []
+                }
+            tasks[record['task_id']]['issues'].append({'line': record['line'], 'description': record['description']})
+        return messages_by_task_id
+
+    def render_text(self) -> str:
+        """Render the messages as the human-readable log, grouped by log level and Task ID."""
+        messages_by_task_id = self.get_messages()
+        content = []
+        for level in self.LEVELS:
+            if messages_by_task_id[level]:
+                content.append(f"Log Level: {level}\n")
+                for task_id, details in messages_by_task_id[level].items():
+                    content.append(f"Task ID: {task_id}\n")
+                    content.append(f"Task Name: {details['task_name']}\n")
+                    content.append(f"Site: {details['site']}\n")
                     for issue in details['issues']:
                         if issue['line']:
-                            content += f"Line: {issue['line']}\n"
-                        content += f"Issue: {issue['description']}\n"
-                    content += "\n\n"
-                content += "\n\n"
+                            content.append(f"Line: {issue['line']}\n")
+                        content.append(f"Issue: {issue['description']}\n")
+                    content.append("\n\n")
+                content.append("\n\n")
+        for summary in self.summaries:
+            content.append(f"{summary}\n\n")
+        return ''.join(content)
 
-        # Write the consolidated content to the file
-        with open(filename, 'w') as file:
-            file.write(content)
+    def add_summary(self, text: str):
+        """Add a block of text written after the messages, like the profile of the run."""
+        with self.lock:
+            self.summaries.append(text)
 
-    def get_tasks_ids(cls) -> list:
-        """Collect all unique task IDs from the logged messages."""
-        task_ids = set()
-        for level in cls.messages_by_task_id.values():
-            for task_id in level.keys():
-                task_ids.add(task_id)
-        return list(task_ids)
+    def save_to_file(self):
+        """Save all logged messages to the log of the instance, grouped by log level and Task ID, with overwriting."""
+        with open(self.log_path, 'w') as file:
+            file.write(self.render_text())
+
+    def get_task_messages(self, task_id: str) -> list:
+        """Return the issues logged for a task as (level name, line, issue description) tuples."""
+        return [(record['level'], record['line'], record['description']) for record in self.get_records(task_id=task_id)]
 
-# Initialize the Logger class attributes
-Logger.initialize_class_attributes()
+    def sort_by_task_ids(self, task_ids):
+        """Order the records as their tasks appear in task_ids, the structured files keep the order they were logged in."""
+        positions = {}
+        for position, task_id in enumerate(task_ids):
+            positions.setdefault(task_id, position)
+        with self.lock:
+            for records in [self.records, *self.records_by_site.values(), *self.records_by_level.values()]:
+                records.sort(key=lambda record: positions.get(record['task_id'], len(positions)))
 
+    def is_flagged(self, task_id: str) -> bool:
+        """Whether an issue was logged for the Task ID."""
+        return task_id in self.flagged_task_ids
+
+    def get_tasks_ids(self) -> list:
+        """Collect all unique task IDs from the logged messages."""
+        with self.lock:
+            return list(self.flagged_task_ids)
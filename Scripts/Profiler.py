@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from variables import profiling_enabled, profile_memory, profile_stage, profile_tool, profile_output_path
+
+# Shared by every stage when profiling is disabled, entering it does nothing
+disabled_stage = nullcontext()
+
+def get_process_peak_memory_mb() -> float:
+    """Peak memory of the whole process since it started, in MB, it can't be reset between the stages."""
+    try:
+        import resource
+    except ImportError:
+        return get_process_peak_memory_mb_windows()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def get_process_peak_memory_mb_windows() -> float:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+    get_current_process.restype = wintypes.HANDLE
+    get_process_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_process_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    if not get_process_memory_info(get_current_process(), ctypes.byref(counters), counters.cb):
+        return 0.0
+    return counters.PeakWorkingSetSize / 1024 / 1024
+
+class RunProfiler:
+    def __init__(self, enabled: bool = profiling_enabled, stage_to_profile: str = profile_stage, tool: str = profile_tool, output_path: str = profile_output_path, trace_memory: bool = profile_memory):
+        """Record the wall time, CPU time and rows of every stage of a run, with trace_memory the peak memory allocated by the stage."""
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.stage_to_profile = stage_to_profile
+        self.tool = tool
+        self.output_path = output_path
+        self.stages = []
+
+    def stage(self, name: str):
+        """Context manager that measures the code it runs as the stage name."""
+        if not self.enabled:
+            return disabled_stage
+        return self.measure(name)
+
+    @contextmanager
+    def measure(self, name: str):
+        record = {'name': name, 'wall': 0.0, 'cpu': 0.0, 'peak_memory_mb': None, 'rows': None}
+        self.stages.append(record)
+        # The peak is traced from the memory in use when the stage starts
+        tracing = self.trace_memory or (name == self.stage_to_profile and self.tool == 'tracemalloc')
+        started_tracing = tracing and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if tracing:
+            memory_start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        profiler = None
+        if name == self.stage_to_profile:
+            profiler = self.start_tool()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record['wall'] = time.perf_counter() - wall_start
+            record['cpu'] = time.process_time() - cpu_start
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                record['peak_memory_mb'] = (peak - memory_start) / 1024 / 1024
+            if name == self.stage_to_profile:
+                self.dump_tool(name, profiler)
+            if started_tracing:
+                tracemalloc.stop()
+
+    def add_rows(self, name: str, rows: int):
+        """Add the rows processed by the last run of the stage."""
+        if not self.enabled:
+            return
+        for record in reversed(self.stages):
+            if record['name'] == name:
+                record['rows'] = (record['rows'] or 0) + rows
+                return
+
+    def start_tool(self):
+        # tracemalloc is already tracing the stage
+        if self.tool == 'tracemalloc':
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def dump_tool(self, name: str, profiler):
+        """Write the cProfile statistics or the tracemalloc top allocations of the stage."""
+        if not os.path.exists(self.output_path):
+            os.makedirs(self.output_path)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H-%M-%S")
+        base_path = os.path.join(self.output_path, f"{name} {timestamp}")
+        if self.tool == 'tracemalloc':
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            with open(f"{base_path} tracemalloc.txt", 'w') as f:
+                f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MB\n\n")
+                for statistic in snapshot.statistics('lineno')[:50]:
+                    f.write(f"{statistic}\n")
+            return
+        profiler.disable()
+        profiler.dump_stats(f"{base_path}.prof")
+        with open(f"{base_path} cprofile.txt", 'w') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(50)
+
+    def get_summary(self) -> str:
+        """Render the stages as a table for the run log."""
+        # The memory column is only there when the stages were traced
+        memory_header = f"{'Peak (MB)':>12}" if self.trace_memory else ''
+        lines = ["Run Profile", f"{'Stage':<28}{'Wall (s)':>10}{'CPU (s)':>10}{memory_header}{'Rows':>10}"]
+        for record in self.stages:
+            rows = '' if record['rows'] is None else record['rows']
+            memory = f"{record['peak_memory_mb']:>12.1f}" if self.trace_memory else ''
+            lines.append(f"{record['name']:<28}{record['wall']:>10.3f}{record['cpu']:>10.3f}{memory}{rows:>10}")
+        lines.append(f"{'Total':<28}{sum(r['wall'] for r in self.stages):>10.3f}{sum(r['cpu'] for r in self.stages):>10.3f}")
+        lines.append(f"Process peak memory: {get_process_peak_memory_mb():.1f} MB")
+        return '\n'.join(lines) + '\n'
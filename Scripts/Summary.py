@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+# Calculated columns of the Tasks table, computed here the same way the template formulas do
+category_by_bucket = {
+    '01.BACKLOG': '2. Not started methods',
+    '03.CONFIGURATION IN PROGRESS': '3. Astrix in progress methods',
+    '04.BLOCKED': '3. Astrix in progress methods',
+    '05.CONFIGURATION COMPLETE': '3. Astrix in progress methods',
+    '06.PEER REVIEW IN PROGRESS': '3. Astrix in progress methods',
+    '07.PEER REVIEW-REWORK REQ': '3. Astrix in progress methods',
+    '08.READY FOR DEMO': '3. Astrix in progress methods',
+    '09.DEMO IN PROGRESS': '3. Astrix in progress methods',
+    '10.CLIENT REWORK REQUIRED': '3. Astrix in progress methods',
+    '11.CLIENT REWORK IN PROGRESS': '3. Astrix in progress methods',
+    '12.READY FOR CLIENT VERIFICATION': '4. Lilly in progress methods',
+    '13.VERIFICATION IN PROGRESS': '4. Lilly in progress methods',
+    '14.VERIFICATION COMPLETE': '4. Lilly in progress methods',
+    '15.VERIFYING KANBAN DATA': '5. Complete methods',
+    '16.READY TO MIGRATE': '5. Complete methods',
+    '17.ADDED TO PACKAGE': '5. Complete methods',
+    '18.MOVED TO PROD': '5. Complete methods',
+}
+default_category = '1. Out of Scope'
+effective_columns = {
+    'Effective Configuration Days': ('03.Configuration In Progress', '04.Blocked'),
+    'Effective Peer Review Rework Days': ('07.Peer Review - Rework Req.', 'Blocked Peer Review Rework Days'),
+    'Effective Demo Rework Days': ('Demo Rework Days', 'Blocked Demo Rework Days'),
+    'Effective Rework Client Verification Days': ('11.Client Rework In Progress', 'Blocked Rework Client Verification Days'),
+}
+time_column_suffix = ' Time'
+
+# Pivot table captions
+grand_total = 'Grand Total'
+blank_item = '(blank)'
+aggregation_functions = {'count': 'sum', 'sum': 'sum', 'average': 'mean', 'max': 'max', 'min': 'min'}
+
+def get_days(column: pd.Series) -> pd.Series:
+    """Numbers of the column, formulas and text are NaN."""
+    return pd.to_numeric(column, errors='coerce')
+
+def is_filled(column: pd.Series) -> pd.Series:
+    return column.notna() & column.astype(str).ne('')
+
+def get_time_bucket(days: pd.Series) -> pd.Series:
+    """Same buckets as the Time columns formula, values between 5 and 6 days fall in the last one like in Excel."""
+    conditions = [days.isna() | (days == 0), days <= 5, (days >= 6) & (days <= 10)]
+    choices = ['No Data', '01.Less than 5 days', '02.More than 5 days and Less than 10 days']
+    return pd.Series(np.select(conditions, choices, '03.More than 10 days'), index=days.index)
+
+def add_calculated_columns(tasks: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of the tasks with the Category, Effective and Time columns of the template computed."""
+    tasks = tasks.copy()
+    if 'Category' in tasks.columns:
+        bucket_names = tasks['Bucket Name'].astype(str).str.strip().str.upper()
+        tasks['Category'] = bucket_names.map(category_by_bucket).fillna(default_category)
+    for column, (days_column, blocked_column) in effective_columns.items():
+        if column in tasks.columns:
+            tasks[column] = get_days(tasks[days_column]).fillna(0) - get_days(tasks[blocked_column]).fillna(0)
+    for column in tasks.columns:
+        days_column = column[:-len(time_column_suffix)]
+        if column.endswith(time_column_suffix) and days_column in tasks.columns:
+            tasks[column] = get_time_bucket(get_days(tasks[days_column]))
+    return tasks
+
+def aggregate(frame: pd.DataFrame, row_fields: list, column_fields: list, aggregations: dict) -> pd.DataFrame:
+    """Aggregate the data fields by the row and column fields, with a grand total column when there are column fields."""
+    data_names = list(aggregations)
+    summary = frame.groupby(row_fields + column_fields)[data_names].agg(aggregations)
+    if column_fields:
+        summary = summary.unstack(column_fields)
+        totals = frame.groupby(row_fields)[data_names].agg(aggregations)
+        for name in data_names:
+            summary[(name,) + (grand_total,) * len(column_fields)] = totals[name]
+    return summary
+
+def get_pivot_summary(tasks: pd.DataFrame, pivot: dict) -> pd.DataFrame:
+    """Aggregate the tasks like the pivot table does, with its grand totals."""
+    frame = pd.DataFrame(index=tasks.index)
+    aggregations = {}
+    for name, field, subtotal in pivot['data']:
+        # Excel counts the non-empty cells and sums the numbers
+        frame[name] = is_filled(tasks[field]).astype(int) if subtotal == 'count' else get_days(tasks[field])
+        aggregations[name] = aggregation_functions.get(subtotal, 'sum')
+    for field in pivot['rows'] + pivot['columns']:
+        frame[field] = tasks[field].where(is_filled(tasks[field]), blank_item).astype(str)
+
+    row_fields, column_fields = pivot['rows'], pivot['columns']
+    if not row_fields:
+        # Without row fields the pivot table is a single row of totals
+        row_fields = ['']
+        frame[''] = grand_total
+    summary = aggregate(frame, row_fields, column_fields, aggregations)
+    if pivot['rows']:
+        # The grand total row is the same aggregation with every task in a single row
+        total_frame = frame.assign(**{field: grand_total if position == 0 else '' for position, field in enumerate(row_fields)})
+        summary = pd.concat([summary, aggregate(total_frame, row_fields, column_fields, aggregations)])
+
+    if column_fields:
+        # Data fields in the order of the pivot table, each with its grand total column last
+        ordered_columns = []
+        for name in aggregations:
+            name_columns = [column for column in summary.columns if column[0] == name]
+            ordered_columns += sorted(name_columns, key=lambda column: column[1:] == (grand_total,) * len(column_fields))
+        summary = summary[ordered_columns]
+        summary.columns = [' - '.join(map(str, column)) if len(aggregations) > 1 else ' - '.join(map(str, column[1:])) for column in summary.columns]
+    return summary
+
+def get_summary_rows(title: str, filters: list, summary: pd.DataFrame) -> list:
+    """Lay out a summary as sheet rows: its title, its filters, the header and the values."""
+    rows = [[title]]
+    rows += [[f"{field}: (All)"] for field in filters]
+    summary = summary.reset_index(names=[name or '' for name in summary.index.names])
+    rows.append([str(column) for column in summary.columns])
+    values = summary.astype(object).where(summary.notna(), None)
+    rows += values.values.tolist()
+    rows.append([])
+    return rows
+
+def get_summary_sheets(tasks: pd.DataFrame, pivot_tables: list) -> dict:
+    """Compute every pivot table of the template and return the rows of one summary sheet per pivot sheet."""
+    tasks = add_calculated_columns(tasks)
+    summary_sheets = {}
+    for pivot in pivot_tables:
+        # Excel sheet names can't be longer than 31 characters
+        sheet_name = f"{pivot['sheet']} Summary"[:31]
+        summary = get_pivot_summary(tasks, pivot)
+        summary_sheets.setdefault(sheet_name, []).extend(get_summary_rows(f"{pivot['name']} ({pivot['location']})", pivot['filters'], summary))
+    return summary_sheets
+
+def write_summary_sheets(wb, summary_sheets: dict):
+    """Write the summary sheets in an openpyxl workbook, replacing the ones of a previous run."""
+    from openpyxl.styles import Font
+    bold_font = Font(bold=True)
+    for sheet_name, rows in summary_sheets.items():
+        if sheet_name in wb.sheetnames:
+            wb.remove(wb[sheet_name])
+        ws = wb.create_sheet(sheet_name)
+        for row in rows:
+            ws.append(row)
+            if len(row) == 1:
+                ws.cell(row=ws.max_row, column=1).font = bold_font
+
+def write_summary_sheets_xlwings(wb, summary_sheets: dict):
+    """Write the summary sheets in an xlwings workbook, with one write per sheet."""
+    for sheet_name, rows in summary_sheets.items():
+        if sheet_name in [s.name for s in wb.sheets]:
+            wb.sheets[sheet_name].delete()
+        sheet = wb.sheets.add(sheet_name, after=wb.sheets[-1])
+        width = max(len(row) for row in rows)
+        sheet.range('A1').value = [row + [None] * (width - len(row)) for row in rows]
@@ -0,0 +1,200 @@
+import argparse
+import os
+import random
+from datetime import date, timedelta
+import pandas as pd
+from variables import required_headers, dashboard_required_headers, financial_required_headers
+from Custom import desc_keys, desc_keys_values
+from Summary import category_by_bucket
+
+# Label columns of the template, the exports also have labels that are not in the template
+label_names = ['TEST METHOD', 'PRODUCT', 'INSTRUMENT', 'PRODUCT VARIANT', 'SAMPLE PLAN', 'CALIBRATION', 'RAW MATERIAL',
+               'DRUG SUBSTANCE', 'MICRO METHOD', 'NMP METHOD', 'IN PROCESS', 'FINISHED PRODUCT', 'EMPOWER', 'PHASE 2.5',
+               'PHASE 3.0', 'FULL BUILD', 'SKELETON BUILD']
+unknown_label_names = ['Urgent', 'On Hold', 'Needs Review']
+# The buckets of the boards as they are written in Planner, plus one that is out of scope
+bucket_names = [bucket.title() for bucket in category_by_bucket] + ['00.On Hold']
+people = ['Ana Perez', 'John Smith', 'Maria Garcia', 'Li Wei', 'Sam Taylor', 'Priya Patel']
+# Other columns of the Planner exports, read but not used by the reports
+export_columns = ['Assigned To', 'Created By', 'Created Date', 'Start Date', 'Due Date', 'Priority', 'Progress', 'Checklist Items']
+# Ways the team gets a description line wrong
+malformed_kinds = ['invalid date', 'missing colon', 'extra colon', 'misspelled key', 'missing key', 'empty description']
+# Planner Task IDs are 28 characters long
+task_id_characters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+task_id_length = 28
+
+def get_end_key(key: str) -> str:
+    """Return the key with the end dates of a start key, or None when the key is not a start key."""
+    end_key = key.replace('start date', 'end date')
+    return end_key if end_key != key and end_key in desc_keys_values else None
+
+end_keys = {key: get_end_key(key) for key in desc_keys_values if get_end_key(key)}
+
+def format_date(day: date) -> str:
+    return day.strftime('%m/%d/%y')
+
+def add_business_days(day: date, days: int) -> date:
+    while days > 0:
+        day += timedelta(days=1)
+        if day.weekday() < 5:
+            days -= 1
+    return day
+
+def get_key_dates(rng: random.Random, start: date, density: float, today: date) -> dict:
+    """Return the dates of every key of one task, in the order the task goes through the stages, the stages after today are empty."""
+    key_dates = {}
+    cursor = start
+    for key in desc_keys_values:
+        if key in key_dates or key == desc_keys.VerificationAssignedTo.value:
+            continue
+        if rng.random() >= density or cursor >= today:
+            key_dates[key] = []
+            if key in end_keys:
+                key_dates[end_keys[key]] = []
+            continue
+        # Configuration happens once, the reviews, demos and verifications can be repeated
+        repetitions = 1 if not key.startswith('all ') else rng.choice([1, 1, 1, 2, 2, 3])
+        start_dates, end_dates = [], []
+        for _ in range(repetitions):
+            cursor = add_business_days(cursor, rng.randint(0, 5))
+            start_dates.append(format_date(cursor))
+            if key in end_keys:
+                cursor = add_business_days(cursor, rng.randint(1, 10))
+                end_dates.append(format_date(cursor))
+        key_dates[key] = start_dates
+        if key in end_keys:
+            # The last stage may still be open
+            if rng.random() < 0.1:
+                end_dates.pop()
+            key_dates[end_keys[key]] = end_dates
+    return key_dates
+
+def format_key(rng: random.Random, key: str) -> str:
+    """Write the key like the team does, mostly in title case and sometimes with extra spaces."""
+    text = key.title() if rng.random() < 0.8 else key.capitalize()
+    if rng.random() < 0.05:
+        text = text.replace(' ', '  ', 1)
+    return text
+
+def get_description(rng: random.Random, start: date, density: float, malformed_rate: float, today: date) -> str:
+    """Return a description with every key of desc_keys, and a malformed line in malformed_rate of them."""
+    key_dates = get_key_dates(rng, start, density, today)
+    lines = []
+    for key in desc_keys_values:
+        if key == desc_keys.VerificationAssignedTo.value:
+            value = rng.choice(people) if rng.random() < density else ''
+        else:
+            value = ', '.join(key_dates[key])
+        lines.append(f"{format_key(rng, key)}: {value}")
+
+    if rng.random() < malformed_rate:
+        kind = rng.choice(malformed_kinds)
+        line_index = rng.randrange(len(lines))
+        key = desc_keys_values[line_index]
+        if kind == 'empty description':
+            return ''
+        elif kind == 'invalid date':
+            lines[line_index] = f"{format_key(rng, key)}: {rng.randint(13, 19)}/{rng.randint(32, 45)}/24"
+        elif kind == 'missing colon':
+            lines[line_index] = lines[line_index].replace(':', '', 1)
+        elif kind == 'extra colon':
+            lines[line_index] = lines[line_index].replace(':', '::', 1)
+        elif kind == 'misspelled key':
+            lines[line_index] = lines[line_index].replace('ate', 'aet', 1)
+        else:
+            del lines[line_index]
+    # Descriptions typed in Planner come with Windows line breaks
+    return '\r\n'.join(lines)
+
+def get_labels(rng: random.Random) -> str:
+    labels = rng.sample(label_names, rng.randint(0, 3))
+    if rng.random() < 0.1:
+        labels.append(rng.choice(unknown_label_names))
+    # Spaces around the separators and lower case labels are common
+    return ';'.join(label if rng.random() < 0.8 else f" {label.lower()}" for label in labels)
+
+def get_task_id(rng: random.Random) -> str:
+    return ''.join(rng.choice(task_id_characters) for _ in range(task_id_length))
+
+def generate_board(rng: random.Random, tasks: int, density: float, malformed_rate: float, today: date) -> pd.DataFrame:
+    """Return a Planner export of one site with the given number of tasks."""
+    rows = []
+    for task_number in range(1, tasks + 1):
+        created = today - timedelta(days=rng.randint(30, 400))
+        rows.append({
+            'Task ID': get_task_id(rng),
+            'Task Name': f"Method {task_number:05d}",
+            'Bucket Name': rng.choice(bucket_names),
+            'Assigned To': rng.choice(people),
+            'Created By': rng.choice(people),
+            'Created Date': format_date(created),
+            'Start Date': format_date(created + timedelta(days=rng.randint(0, 20))),
+            'Due Date': format_date(created + timedelta(days=rng.randint(30, 120))),
+            'Priority': rng.choice(['Low', 'Medium', 'Important', 'Urgent']),
+            'Progress': rng.choice(['Not started', 'In progress', 'Completed']),
+            'Checklist Items': '',
+            'Labels': get_labels(rng),
+            'Description': get_description(rng, created, density, malformed_rate, today),
+        })
+    columns = required_headers + export_columns[:1] + dashboard_required_headers[::-1] + export_columns[1:]
+    return pd.DataFrame(rows, columns=columns)
+
+def generate_financial(rng: random.Random, boards: list, invoiced_rate: float = 0.6) -> pd.DataFrame:
+    """Return the financial sheet with the invoices of part of the tasks, a few of them repeated or of unknown tasks."""
+    tasks = pd.concat(boards, ignore_index=True)[required_headers]
+    invoices = tasks.sample(frac=invoiced_rate, random_state=rng.randint(0, 2 ** 31)).reset_index(drop=True)
+    # Invoices corrected in a second row and invoices of tasks deleted from the boards
+    extra_rows = max(1, len(invoices) // 100)
+    repeated = invoices.sample(n=min(extra_rows, len(invoices)), random_state=rng.randint(0, 2 ** 31))
+    unknown = pd.DataFrame({'Task ID': [get_task_id(rng) for _ in range(extra_rows)], 'Task Name': 'Deleted method', 'Bucket Name': '18.Moved To Prod'})
+    invoices = pd.concat([invoices, repeated, unknown], ignore_index=True)
+
+    today = date.today()
+    invoices[financial_required_headers[0]] = [rng.choice(['Yes', 'No', '']) for _ in range(len(invoices))]
+    invoices[financial_required_headers[1]] = [format_date(today - timedelta(days=rng.randint(0, 300))) for _ in range(len(invoices))]
+    invoices[financial_required_headers[2]] = [rng.choice(['Yes', 'No', '']) for _ in range(len(invoices))]
+    invoices[financial_required_headers[3]] = [format_date(today - timedelta(days=rng.randint(0, 200))) if rng.random() < 0.5 else '' for _ in range(len(invoices))]
+    return invoices
+
+def generate_exports(output_dir: str, tasks: int = 1000, sites: int = 4, density: float = 0.7, malformed_rate: float = 0.1, seed: int = 0) -> list:
+    """Write one export per site and the financial file to output_dir, the tasks are split evenly between the sites.
+    density is the share of keys of each description that have dates, malformed_rate the share of descriptions with a mistake.
+    Returns the paths of the files, the same seed writes the same files on the same day."""
+    rng = random.Random(seed)
+    today = date.today()
+    os.makedirs(output_dir, exist_ok=True)
+
+    file_paths = []
+    boards = []
+    for site_number in range(sites):
+        site_tasks = tasks // sites + (1 if site_number < tasks % sites else 0)
+        board = generate_board(rng, site_tasks, density, malformed_rate, today)
+        # The site of a task is the first word of the name of its file
+        file_path = os.path.join(output_dir, f"Site{site_number + 1:02d} Export.xlsx")
+        board.to_excel(file_path, index=False)
+        boards.append(board)
+        file_paths.append(file_path)
+
+    file_path = os.path.join(output_dir, 'Financial.xlsx')
+    generate_financial(rng, boards).to_excel(file_path, index=False)
+    file_paths.append(file_path)
+    return file_paths
+
+def parse_arguments(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Write synthetic Planner exports and a financial file to measure the reports without client data.")
+    parser.add_argument('output_dir', help="Folder where the exports are written")
+    parser.add_argument('--tasks', type=int, default=1000, help="Number of tasks of all the sites together")
+    parser.add_argument('--sites', type=int, default=4, help="Number of boards, one file per site")
+    parser.add_argument('--density', type=float, default=0.7, help="Share of the description keys that have dates, between 0 and 1")
+    parser.add_argument('--malformed', type=float, default=0.1, help="Share of the descriptions with a malformed line, between 0 and 1")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator")
+    return parser.parse_args(argv)
+
+def main(argv: list = None):
+    args = parse_arguments(argv)
+    file_paths = generate_exports(args.output_dir, args.tasks, args.sites, args.density, args.malformed, args.seed)
+    for file_path in file_paths:
+        print(f"Written {file_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import warnings
+import pandas as pd
+from Cache import read_cached
+from Utils import read_excel_file
+from variables import template_path, template_cache
+
+def get_pivot_caches(wb) -> list:
+    """Describe the pivot tables of the workbook and the source of their caches."""
+    pivot_caches = []
+    for worksheet in wb.worksheets:
+        for pivot in worksheet._pivots:
+            source = pivot.cache.cacheSource.worksheetSource
+            pivot_caches.append({
+                'sheet': worksheet.title,
+                'pivot_table': pivot.name,
+                'cache_id': pivot.cacheId,
+                'source_name': source.name if source is not None else None,
+                'source_sheet': source.sheet if source is not None else None,
+                'source_ref': source.ref if source is not None else None,
+            })
+    return pivot_caches
+
+def get_pivot_tables(wb) -> list:
+    """Describe the layout of each pivot table: its row, column, data and filter fields by name."""
+    pivot_tables = []
+    for worksheet in wb.worksheets:
+        for pivot in worksheet._pivots:
+            field_names = [field.name for field in pivot.cache.cacheFields]
+            pivot_tables.append({
+                'sheet': worksheet.title,
+                'name': pivot.name,
+                'location': pivot.location.ref,
+                'rows': [field_names[field.x] for field in pivot.rowFields if field.x >= 0],
+                # The negative index is the Values pseudo field, the data fields are always laid out as columns
+                'columns': [field_names[field.x] for field in pivot.colFields if field.x >= 0],
+                'data': [(data.name, field_names[data.fld], data.subtotal) for data in pivot.dataFields],
+                'filters': [field_names[field.fld] for field in pivot.pageFields],
+            })
+    return pivot_tables
+
+def extract_template_metadata(file_path: str) -> dict:
+    """Read what the reports need to know about the template: the Tasks table layout, its first-row formulas and the pivot tables."""
+    # openpyxl is only loaded when the template is not in the cache
+    from openpyxl import load_workbook
+    from openpyxl.utils import get_column_letter, range_boundaries
+    from Headless import get_first_row_formulas
+    with warnings.catch_warnings():
+        # Slicers are not supported by openpyxl, they don't matter to read the template
+        warnings.simplefilter('ignore', UserWarning)
+        wb = load_workbook(file_path)
+    if 'Tasks' not in wb.sheetnames:
+        raise ValueError("The source file does not contain a sheet named 'Tasks'.")
+    sheet = wb['Tasks']
+
+    table_name = 'Tasks'
+    if table_name not in sheet.tables:
+        raise ValueError(f"The sheet 'Tasks' does not contain a table named '{table_name}'.")
+    table = sheet.tables[table_name]
+    first_col, header_row, last_col, _ = range_boundaries(table.ref)
+
+    return {
+        'table_name': table_name,
+        'table_ref': table.ref,
+        'columns': [column.name for column in table.tableColumns],
+        'last_column_letter': get_column_letter(last_col),
+        'first_row': header_row + 1,
+        'first_row_formulas': get_first_row_formulas(sheet, header_row + 1, last_col),
+        'pivot_caches': get_pivot_caches(wb),
+        'pivot_tables': get_pivot_tables(wb),
+        'template': read_excel_file(file_path),
+    }
+
+def get_template_metadata(file_path: str = template_path, use_cache: bool = template_cache) -> dict:
+    """Return the template metadata, taken from the cache when a template with the same content was already read."""
+    if use_cache:
+        return read_cached(file_path, extract_template_metadata, 'template')
+    return extract_template_metadata(file_path)
+
+def get_template(file_path: str = template_path, use_cache: bool = template_cache) -> pd.DataFrame:
+    """Return the template as a DataFrame, the cached copy is never modified."""
+    if use_cache:
+        return get_template_metadata(file_path, use_cache)['template'].copy()
+    return read_excel_file(file_path)
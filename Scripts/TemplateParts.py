@@ -0,0 +1,318 @@
+import os
+import posixpath
+import re
+import zipfile
+from xml.sax.saxutils import quoteattr
+import xml.etree.ElementTree as ET
+
+# openpyxl drops what it doesn't model when it saves the template: the slicers and their caches, the drawing shapes,
+# pictures and chart styles, the custom XML, the web extensions and the extension list of every part.
+# They are copied back from the template into the saved report.
+relationships_namespace = 'http://schemas.openxmlformats.org/package/2006/relationships'
+office_relationships_namespace = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+content_types_namespace = 'http://schemas.openxmlformats.org/package/2006/content-types'
+content_types_part = '[Content_Types].xml'
+xml_declaration = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+# Excel builds the calculation chain again, openpyxl drops the page setup reference to the printer settings
+# and writes the strings in the cells
+skipped_relationship_types = {'calcChain', 'printerSettings', 'sharedStrings'}
+# Elements that come after the drawing in a worksheet, a missing drawing reference is added before the first of them
+elements_after_drawing = ['legacyDrawing', 'legacyDrawingHF', 'drawingHF', 'picture', 'oleObjects', 'controls', 'webPublishItems', 'tableParts', 'extLst']
+
+def get_relationships_part(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, '_rels', f"{name}.rels")
+
+def resolve_target(part: str, target: str) -> str:
+    """Name of the part a relationship of part points to, the targets are relative to the folder of the part."""
+    if target.startswith('/'):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+def get_type_name(relationship: dict) -> str:
+    return relationship['type'].rsplit('/', 1)[-1]
+
+class Package:
+    def __init__(self, path: str):
+        """The parts of an xlsx file by name, with their content types."""
+        with zipfile.ZipFile(path) as archive:
+            self.parts = {name: archive.read(name) for name in archive.namelist()}
+        content_types = ET.fromstring(self.parts.pop(content_types_part))
+        self.defaults = {}
+        self.overrides = {}
+        for element in content_types:
+            if element.tag == f"{{{content_types_namespace}}}Default":
+                self.defaults[element.get('Extension').lower()] = element.get('ContentType')
+            elif element.tag == f"{{{content_types_namespace}}}Override":
+                self.overrides[element.get('PartName').lstrip('/')] = element.get('ContentType')
+
+    def get_relationships(self, part: str) -> list:
+        """Relationships of the part, with the name of the part they point to as target."""
+        relationships_part = get_relationships_part(part)
+        if relationships_part not in self.parts:
+            return []
+        relationships = []
+        for element in ET.fromstring(self.parts[relationships_part]):
+            external = element.get('TargetMode') == 'External'
+            relationships.append({
+                'id': element.get('Id'),
+                'type': element.get('Type'),
+                'target': element.get('Target') if external else resolve_target(part, element.get('Target')),
+                'external': external,
+            })
+        return relationships
+
+    def set_relationships(self, part: str, relationships: list):
+        elements = []
+        for relationship in relationships:
+            target = relationship['target'] if relationship['external'] else f"/{relationship['target']}"
+            mode = ' TargetMode="External"' if relationship['external'] else ''
+            elements.append(f"<Relationship Id={quoteattr(relationship['id'])} Type={quoteattr(relationship['type'])} Target={quoteattr(target)}{mode}/>")
+        self.parts[get_relationships_part(part)] = (f'{xml_declaration}<Relationships xmlns="{relationships_namespace}">' + ''.join(elements) + '</Relationships>').encode('utf-8')
+
+    def add_relationship(self, part: str, relationship_type: str, target: str) -> str:
+        """Add a relationship from part to target and return its id."""
+        relationships = self.get_relationships(part)
+        ids = {relationship['id'] for relationship in relationships}
+        number = len(relationships) + 1
+        while f"rId{number}" in ids:
+            number += 1
+        relationships.append({'id': f"rId{number}", 'type': relationship_type, 'target': target, 'external': False})
+        self.set_relationships(part, relationships)
+        return f"rId{number}"
+
+    def get_target(self, part: str, type_name: str) -> str:
+        """Part pointed to by the first relationship of the type, or None."""
+        for relationship in self.get_relationships(part):
+            if get_type_name(relationship) == type_name and not relationship['external']:
+                return relationship['target']
+        return None
+
+    def get_text(self, part: str) -> str:
+        return self.parts[part].decode('utf-8')
+
+    def save(self, path: str):
+        content_types = [f'{xml_declaration}<Types xmlns="{content_types_namespace}">']
+        content_types += [f"<Default Extension={quoteattr(extension)} ContentType={quoteattr(content_type)}/>" for extension, content_type in self.defaults.items()]
+        content_types += [f"<Override PartName={quoteattr('/' + part)} ContentType={quoteattr(content_type)}/>" for part, content_type in self.overrides.items() if part in self.parts]
+        content_types.append('</Types>')
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with zipfile.ZipFile(temporary_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(content_types_part, ''.join(content_types))
+            for part, content in self.parts.items():
+                archive.writestr(part, content)
+        os.replace(temporary_path, path)
+
+def copy_part_tree(template: Package, report: Package, part: str):
+    """Copy a part of the template with its relationships, and the parts they point to that the report doesn't have."""
+    if part in report.parts or part not in template.parts:
+        return
+    report.parts[part] = template.parts[part]
+    if part in template.overrides:
+        report.overrides[part] = template.overrides[part]
+    else:
+        extension = posixpath.splitext(part)[1][1:].lower()
+        if extension in template.defaults:
+            report.defaults.setdefault(extension, template.defaults[extension])
+    relationships_part = get_relationships_part(part)
+    if relationships_part in template.parts:
+        report.parts[relationships_part] = template.parts[relationships_part]
+        for relationship in template.get_relationships(part):
+            if not relationship['external']:
+                copy_part_tree(template, report, relationship['target'])
+
+def remove_part_tree(report: Package, part: str):
+    """Remove a part of the report, its relationships and the parts they point to."""
+    if part not in report.parts:
+        return
+    relationships = report.get_relationships(part)
+    del report.parts[part]
+    report.overrides.pop(part, None)
+    report.parts.pop(get_relationships_part(part), None)
+    for relationship in relationships:
+        if not relationship['external']:
+            remove_part_tree(report, relationship['target'])
+
+def get_root_tag(xml: str) -> re.Match:
+    """The opening tag of the root element, its name is group 1."""
+    return re.compile(r'<([\w:.-]+)[^>]*>').search(xml, xml.find('?>') + 2 if xml.startswith('<?') else 0)
+
+def get_root_extension_list(xml: str, root_name: str) -> str:
+    """The extLst that closes the root element, or None."""
+    closing_tag = f"</{root_name}>"
+    end = xml.rstrip().rfind(closing_tag)
+    if end == -1 or not xml[:end].rstrip().endswith('</extLst>'):
+        return None
+    depth = 0
+    tags = list(re.finditer(r'<(/?)extLst\b[^>]*?(/?)>', xml[:end]))
+    for tag in reversed(tags):
+        if tag.group(2):
+            continue
+        depth += -1 if not tag.group(1) else 1
+        if depth == 0:
+            return xml[tag.start():end].rstrip()
+    return None
+
+def split_extensions(extension_list: str) -> list:
+    """The ext elements of an extLst."""
+    extensions = []
+    depth = 0
+    start = None
+    for tag in re.finditer(r'<(/?)(?:\w+:)?ext\b[^>]*?(/?)>', extension_list):
+        if tag.group(1):
+            depth -= 1
+            if depth == 0:
+                extensions.append(extension_list[start:tag.end()])
+        elif tag.group(2):
+            if depth == 0:
+                extensions.append(tag.group(0))
+        else:
+            if depth == 0:
+                start = tag.start()
+            depth += 1
+    return extensions
+
+def get_namespaces(tag: str) -> dict:
+    return dict(re.findall(r'xmlns:(\w+)="([^"]*)"', tag))
+
+def restore_extension_list(template: Package, report: Package, template_part: str, report_part: str, relationship_ids: dict):
+    """Add the extLst of the template part to the report part, the extensions that point to parts the report doesn't have are left out."""
+    template_xml = template.get_text(template_part)
+    report_xml = report.get_text(report_part)
+    template_root, report_root = get_root_tag(template_xml), get_root_tag(report_xml)
+    # The extLst is written in the default namespace, both roots must be in it
+    if ':' in template_root.group(1) or template_root.group(1) != report_root.group(1):
+        return
+    extension_list = get_root_extension_list(template_xml, template_root.group(1))
+    if extension_list is None or get_root_extension_list(report_xml, report_root.group(1)) is not None:
+        return
+
+    root_namespaces = get_namespaces(template_root.group(0))
+    relationships_prefixes = [prefix for prefix, namespace in root_namespaces.items() if namespace == office_relationships_namespace]
+    relationships_prefix = relationships_prefixes[0] if relationships_prefixes else 'r'
+    id_regex = re.compile(rf'\b{relationships_prefix}:id="([^"]*)"')
+    extensions = []
+    for extension in split_extensions(extension_list):
+        if all(relationship_id in relationship_ids for relationship_id in id_regex.findall(extension)):
+            extensions.append(id_regex.sub(lambda match: f'{relationships_prefix}:id="{relationship_ids[match.group(1)]}"', extension))
+    if not extensions:
+        return
+
+    # The prefixes declared on the template root are declared on the extLst
+    content = ''.join(extensions)
+    used_prefixes = set(re.findall(r'</?(\w+):', content)) | set(re.findall(r'\s(\w+):[\w.-]+=', content))
+    declared_prefixes = set(get_namespaces(content))
+    declarations = ''.join(f' xmlns:{prefix}="{root_namespaces[prefix]}"' for prefix in sorted(used_prefixes - declared_prefixes - {'xmlns'}) if prefix in root_namespaces)
+    end = report_xml.rfind(f"</{report_root.group(1)}>")
+    report.parts[report_part] = (report_xml[:end] + f"<extLst{declarations}>{content}</extLst>" + report_xml[end:]).encode('utf-8')
+
+def restore_part(template: Package, report: Package, template_part: str, report_part: str):
+    """Copy back the parts the template part points to that the report lost, with their relationships, and its extLst."""
+    relationship_ids = {}
+    report_relationships = report.get_relationships(report_part)
+    for relationship in template.get_relationships(template_part):
+        if relationship['external'] or get_type_name(relationship) in skipped_relationship_types:
+            continue
+        target = relationship['target']
+        existing = [report_relationship for report_relationship in report_relationships if (report_relationship['type'], report_relationship['target']) == (relationship['type'], target)]
+        if existing:
+            relationship_ids[relationship['id']] = existing[0]['id']
+        elif target not in report.parts:
+            copy_part_tree(template, report, target)
+            relationship_ids[relationship['id']] = report.add_relationship(report_part, relationship['type'], target)
+    if template_part:
+        restore_extension_list(template, report, template_part, report_part, relationship_ids)
+
+def restore_drawing(template: Package, report: Package, template_sheet: str, report_sheet: str):
+    """Replace the drawing of the report sheet with the one of the template, openpyxl only keeps its charts and pictures."""
+    template_drawing = template.get_target(template_sheet, 'drawing')
+    if template_drawing is None:
+        return
+    report_relationships = report.get_relationships(report_sheet)
+    report_drawings = [relationship for relationship in report_relationships if get_type_name(relationship) == 'drawing']
+    if report_drawings:
+        remove_part_tree(report, report_drawings[0]['target'])
+        copy_part_tree(template, report, template_drawing)
+        report_drawings[0]['target'] = template_drawing
+        report.set_relationships(report_sheet, report_relationships)
+        return
+
+    copy_part_tree(template, report, template_drawing)
+    relationship_id = report.add_relationship(report_sheet, f"{office_relationships_namespace}/drawing", template_drawing)
+    report_xml = report.get_text(report_sheet)
+    positions = [position for position in (report_xml.find(f"<{name}") for name in elements_after_drawing) if position != -1]
+    position = min(positions) if positions else report_xml.rfind('</worksheet>')
+    drawing = f'<drawing xmlns:r="{office_relationships_namespace}" r:id="{relationship_id}"/>'
+    report.parts[report_sheet] = (report_xml[:position] + drawing + report_xml[position:]).encode('utf-8')
+
+def get_sheets(package: Package, workbook: str) -> dict:
+    """sheetId and part of every sheet of the workbook, by name."""
+    targets = {relationship['id']: relationship['target'] for relationship in package.get_relationships(workbook)}
+    sheets = {}
+    for tag in re.findall(r'<sheet\b[^>]*>', package.get_text(workbook)):
+        attributes = dict(re.findall(r'([\w:]+)="([^"]*)"', tag))
+        relationship_id = next(value for name, value in attributes.items() if name.endswith(':id'))
+        sheets[attributes['name']] = (int(attributes['sheetId']), targets[relationship_id])
+    return sheets
+
+def restore_sheet_ids(report: Package, workbook: str, template_sheets: dict):
+    """Give the sheets the sheetId they have in the template, the slicer caches reference the pivot tables by it."""
+    next_sheet_id = max([sheet_id for sheet_id, _ in template_sheets.values()], default=0) + 1
+    def replace(match: re.Match) -> str:
+        nonlocal next_sheet_id
+        tag = match.group(0)
+        name = re.search(r'\bname="([^"]*)"', tag).group(1)
+        if name in template_sheets:
+            sheet_id = template_sheets[name][0]
+        else:
+            sheet_id, next_sheet_id = next_sheet_id, next_sheet_id + 1
+        return re.sub(r'\bsheetId="\d+"', f'sheetId="{sheet_id}"', tag)
+    report.parts[workbook] = re.sub(r'<sheet\b[^>]*>', replace, report.get_text(workbook)).encode('utf-8')
+
+def get_pivot_tables(package: Package, sheet: str) -> dict:
+    """Pivot table parts of the sheet by pivot table name."""
+    pivot_tables = {}
+    for relationship in package.get_relationships(sheet):
+        if get_type_name(relationship) == 'pivotTable' and relationship['target'] in package.parts:
+            name = re.search(r'<(?:\w+:)?pivotTableDefinition\b[^>]*?\sname="([^"]*)"', package.get_text(relationship['target']))
+            if name:
+                pivot_tables[name.group(1)] = relationship['target']
+    return pivot_tables
+
+def get_pivot_caches(package: Package, workbook: str) -> dict:
+    """Pivot cache definition parts by cacheId."""
+    targets = {relationship['id']: relationship['target'] for relationship in package.get_relationships(workbook)}
+    pivot_caches = {}
+    for tag in re.findall(r'<pivotCache\b[^>]*>', package.get_text(workbook)):
+        attributes = dict(re.findall(r'([\w:]+)="([^"]*)"', tag))
+        relationship_id = next(value for name, value in attributes.items() if name.endswith(':id'))
+        pivot_caches[attributes['cacheId']] = targets[relationship_id]
+    return pivot_caches
+
+def restore_template_parts(template_path: str, report_path: str):
+    """Copy back into the report saved by openpyxl the parts of the template it dropped."""
+    template = Package(template_path)
+    report = Package(report_path)
+    template_workbook = template.get_target('', 'officeDocument')
+    report_workbook = report.get_target('', 'officeDocument')
+
+    # Parts of the template and of the report that are the same object of the workbook
+    pairs = [('', ''), (template_workbook, report_workbook)]
+    template_styles, report_styles = template.get_target(template_workbook, 'styles'), report.get_target(report_workbook, 'styles')
+    if template_styles and report_styles:
+        pairs.append((template_styles, report_styles))
+    template_sheets, report_sheets = get_sheets(template, template_workbook), get_sheets(report, report_workbook)
+    sheet_pairs = [(template_sheets[name][1], report_sheets[name][1]) for name in template_sheets if name in report_sheets]
+    for template_sheet, report_sheet in sheet_pairs:
+        pairs.append((template_sheet, report_sheet))
+        template_pivot_tables, report_pivot_tables = get_pivot_tables(template, template_sheet), get_pivot_tables(report, report_sheet)
+        pairs += [(template_pivot_tables[name], report_pivot_tables[name]) for name in template_pivot_tables if name in report_pivot_tables]
+    template_pivot_caches, report_pivot_caches = get_pivot_caches(template, template_workbook), get_pivot_caches(report, report_workbook)
+    pairs += [(template_pivot_caches[cache_id], report_pivot_caches[cache_id]) for cache_id in template_pivot_caches if cache_id in report_pivot_caches]
+
+    restore_sheet_ids(report, report_workbook, template_sheets)
+    for template_sheet, report_sheet in sheet_pairs:
+        restore_drawing(template, report, template_sheet, report_sheet)
+    for template_part, report_part in pairs:
+        restore_part(template, report, template_part, report_part)
+    report.save(report_path)
@@ -1,11 +1,12 @@
 import os
+import numpy as np
 import pandas as pd
 import shutil
 from datetime import datetime
-import xlwings as xw
 import chardet
 import subprocess
 from variables import *
+from Cache import read_cached
 import time
 
 def move_files_info_to_template(combined_dataframes: pd.DataFrame, template: pd.DataFrame):
@@ -79,6 +80,17 @@ def clean_description(text: str) -> str:
     text = text.lower().replace('\r', " ").replace('\t', " ").replace('_x000d_', " ")
     return text
 
+# Two digit years are read the way Excel reads them: 00-29 is 20xx and 30-99 is 19xx
+two_digit_year_cutoff = 30
+
+def get_four_digit_year(year):
+    """Return the year with four digits, year can be a number or a Series of numbers."""
+    if isinstance(year, pd.Series):
+        return year.where(year >= 100, year + np.where(year < two_digit_year_cutoff, 2000, 1900))
+    if year < 100:
+        return year + (2000 if year < two_digit_year_cutoff else 1900)
+    return year
+
 def combine_dataframes(data_frames):
     if data_frames:
         combined_df = pd.concat(data_frames, ignore_index=True)
@@ -108,6 +120,7 @@ def get_last_column_letter(sheet, table_name):
 
 def open_file(file_path: str, app:str):
     if app == "excel":
+        import xlwings as xw
         app = xw.App(visible=True)
         try:
             # Open the workbook in read-only mode
@@ -141,28 +154,54 @@ def delete_all_files_in_folder(folder_path):
             os.remove(file_path)
             print(f"Deleted file: {file_path}")
 
-def store_excel_as_csv(file_paths):
-    #empty the folder first
-    delete_all_files_in_folder(files_directory_path)
-    # Ensure the destination folder exists, create if it doesn't
-    if not os.path.exists(files_directory_path):
-        os.makedirs(files_directory_path)
-    
+def clean_board_data_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Strip the column names and clean the descriptions of a board export, the other files are returned as they are."""
+    if not df.empty and set(required_headers).issubset(df.columns) and set(dashboard_required_headers).issubset(df.columns):
+        df.columns = df.columns.str.strip()  # Clean column names
+        if 'Description' in df.columns:
+            df['Description'] = df['Description'].apply(clean_description)
+    return df
+
+def read_export_file(file_path: str) -> pd.DataFrame:
+    """Read and clean an Excel export, the ingestion cache stores the cleaned DataFrame."""
+    return clean_board_data_frame(pd.read_excel(file_path))
+
+def read_excel_files(file_paths, use_cache: bool = ingestion_cache) -> dict:
+    """Read the Excel files into DataFrames keyed by the name of their CSV snapshot, so the site names stay the same.
+    With use_cache, files already parsed in a previous run are taken from the ingestion cache."""
+    data_frames = {}
     for file_path in file_paths:
         if os.path.isfile(file_path) and file_path.lower().endswith('.xlsx'):
             # Get the file name without the extension
             file_name = os.path.splitext(os.path.basename(file_path))[0]
-            # Define the destination CSV path
-            destination_csv_path = os.path.join(files_directory_path, f"{file_name}.csv")
-            
-            try:
-                # Read the Excel file
-                df = pd.read_excel(file_path)
-                # Save the DataFrame to a CSV file
-                df.to_csv(destination_csv_path, index=False)
-                print(f"Converted {file_path} to {destination_csv_path}")
-            except Exception as e:
-                print(f"Failed to convert {file_path}: {e}")
+            # Read the Excel file, a file that can't be read stops the run
+            if use_cache:
+                data_frames[f"{file_name}.csv"] = read_cached(file_path, read_export_file, 'xlsx')
+            else:
+                data_frames[f"{file_name}.csv"] = read_export_file(file_path)
         else:
             print(f"Skipping {file_path}: Not an Excel file or does not exist")
+    return data_frames
+
+def clean_files_directory():
+    #empty the folder first
+    delete_all_files_in_folder(files_directory_path)
+    # Ensure the destination folder exists, create if it doesn't
+    if not os.path.exists(files_directory_path):
+        os.makedirs(files_directory_path)
+
+def store_data_frame_as_csv(file_name: str, df: pd.DataFrame):
+    # Define the destination CSV path
+    destination_csv_path = os.path.join(files_directory_path, file_name)
+    # Save the DataFrame to a CSV file
+    df.to_csv(destination_csv_path, index=False)
+    print(f"Converted {file_name} to {destination_csv_path}")
+
+def store_data_frames_as_csv(data_frames: dict):
+    clean_files_directory()
+    for file_name, df in data_frames.items():
+        store_data_frame_as_csv(file_name, df)
+
+def store_excel_as_csv(file_paths, use_cache: bool = ingestion_cache):
+    store_data_frames_as_csv(read_excel_files(file_paths, use_cache))
 
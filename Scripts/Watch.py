@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import time
+import traceback
+from CLI import expand_input_paths, scripts_directory, EXIT_SUCCESS
+
+def take_snapshot(directory: str) -> dict:
+    """Modification time and size of the Excel files of the folder, the lock files of open workbooks are skipped."""
+    snapshot = {}
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.lower().endswith('.xlsx') and not entry.name.startswith('~$'):
+            stat = entry.stat()
+            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+def wait_for_changes(directory: str, processed: dict, interval: float, debounce: float) -> dict:
+    """Wait until the files of the folder are different from the processed ones and stopped changing for debounce seconds."""
+    snapshot = take_snapshot(directory)
+    last_change = time.monotonic()
+    while snapshot == processed or time.monotonic() - last_change < debounce:
+        time.sleep(interval)
+        current_snapshot = take_snapshot(directory)
+        if current_snapshot != snapshot:
+            snapshot = current_snapshot
+            last_change = time.monotonic()
+    return snapshot
+
+def run_reports(file_paths: list, checkboxes: tuple, options: dict):
+    # Imported once, the holidays and every module stay loaded between runs
+    import Custom
+    from Cache import trim_memory_cache
+
+    Custom.excecute(file_paths, checkboxes, **options)
+    trim_memory_cache()
+
+def parse_arguments(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Watch a folder and generate the reports again every time its exports change.")
+    parser.add_argument('directory', help="Folder where the exported boards and the financial file are dropped")
+    parser.add_argument('--financial', action='store_true', help="Create the financial report")
+    parser.add_argument('--dashboard', action='store_true', help="Create the dashboard report")
+    parser.add_argument('--engine', choices=['xlwings', 'batched', 'headless'], default='headless', help="Dashboard writer, headless by default")
+    parser.add_argument('--interval', type=float, default=2, help="Seconds between two checks of the folder")
+    parser.add_argument('--debounce', type=float, default=10, help="Seconds without changes before the reports are generated")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a folder")
+    if not (args.financial or args.dashboard):
+        # Both reports unless one is chosen
+        args.financial = args.dashboard = True
+    return args
+
+def main(argv: list = None) -> int:
+    args = parse_arguments(argv)
+    directory = os.path.abspath(args.directory)
+    os.chdir(scripts_directory)
+
+    from Cache import enable_memory_cache
+    enable_memory_cache()
+    # Only the changed tasks are processed again, the parsed files and the template come from the cache
+    options = {'engine': args.engine, 'ingestion': 'memory', 'use_cache': True, 'incremental': args.dashboard}
+    checkboxes = (args.financial, args.dashboard, False)
+
+    print(f"Watching {directory}, press Ctrl+C to stop.")
+    processed = {}
+    try:
+        while True:
+            processed = wait_for_changes(directory, processed, args.interval, args.debounce)
+            file_paths = expand_input_paths([directory])
+            if not file_paths:
+                continue
+            print(f"Generating the reports from {len(file_paths)} files...")
+            started = time.monotonic()
+            try:
+                run_reports(file_paths, checkboxes, options)
+                print(f"Reports generated in {time.monotonic() - started:.1f} seconds.")
+            except Exception:
+                # Keep watching, the next change of the files runs the reports again
+                traceback.print_exc()
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    return EXIT_SUCCESS
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,3 @@
-from datetime import datetime
-year = str(datetime.now().year)
 files_directory_path = '../Files'
 template_path = '../Template/Lilly Kanban Management Template.xlsx'
 new_file_name = 'Lilly Kanban Management'
@@ -7,9 +5,53 @@ financial_new_file_name = 'Financial Tracker File'
 reports_path = '../Report History'
 lattest_report_path = '../Lattest Report'
 log_file_path = '../result.log'
-other_PTO_dates = [f"12/26/{year}",f"12/27/{year}",f"12/28/{year}",
-                   f"12/29/{year}",f"12/30/{year}",f"12/31/{year}",
-                   f"01/01/{year}",f"01/02/{year}"]
+# Company PTO days as mm/dd, they are holidays of every year of the business-day calendar
+other_PTO_days = ["12/26","12/27","12/28",
+                  "12/29","12/30","12/31",
+                  "01/01","01/02"]
+# Years of the business-day calendar before and after the current one, it is stored in business_calendar_path so the holidays are computed once
+calendar_years_before = 5
+calendar_years_after = 1
+business_calendar_path = '../Cache/business_calendar.pkl'
 required_headers = ['Task ID','Task Name', 'Bucket Name']
 dashboard_required_headers = ['Description', 'Labels']
-financial_required_headers = ['Invoice Milestone (60%)', 'Invoice Date', 'Invoice Milestone (40%)', 'Invoice Date2']
\ No newline at end of file
+financial_required_headers = ['Invoice Milestone (60%)', 'Invoice Date', 'Invoice Milestone (40%)', 'Invoice Date2']
+# Dashboard writer: 'xlwings' drives a desktop Excel, 'batched' also drives Excel but with range-level reads and writes, 'headless' writes the file with openpyxl
+dashboard_engine = 'xlwings'
+# Dashboard summaries: 'pivot' refreshes the pivot tables of the template, 'static' computes them with pandas and writes them as summary sheets, it needs ageing_output_mode 'values'
+dashboard_summaries = 'pivot'
+# Ageing days: 'formulas' writes NETWORKDAYS.INTL formulas, 'values' writes the days computed in Python
+ageing_output_mode = 'formulas'
+# Holidays in the formulas: 'inline' repeats the holidays array in every formula, 'named' references it through the holidays_name defined name
+holidays_formula_mode = 'inline'
+holidays_name = 'Holidays'
+# Input files: 'csv' converts them to CSV in the Files folder and reads them back, 'memory' reads them back from CSV in memory without the Files folder,
+# 'parallel' does the same reading the files in ingestion_workers processes (None uses all the cores)
+ingestion_mode = 'csv'
+ingestion_workers = None
+# Content addressed cache of the parsed input files, least recently used entries are evicted by size and age
+ingestion_cache = False
+cache_directory_path = '../Cache'
+cache_max_size_mb = 500
+cache_max_age_days = 30
+# Keep the template layout, formulas and pivot caches in the cache, so the template is read once per version of the file
+template_cache = True
+# Only parse and compute again the tasks that changed since the last run, the rest reuse the results stored in incremental_state_path
+incremental_mode = False
+incremental_state_path = '../Cache/incremental_state.pkl'
+# Keep the CSV snapshot of the input files in the Files folder when ingestion_mode is 'memory'
+keep_csv_snapshot = False
+# Structured copies of the log, streamed while the tasks are analyzed: 'jsonl' and/or 'csv', written next to the log with the format as extension
+log_formats = []
+# Financial report writer: 'pandas' writes the file with to_excel and loads it again to add the table, 'streaming' writes the rows, table and column widths in one pass
+financial_writer = 'pandas'
+# Measure the wall time, CPU time and rows of every stage of a run, with the peak memory of the process, and add them to the log
+profiling_enabled = False
+# Trace the memory allocated by every measured stage with tracemalloc to report its own peak, the traced stages run several times slower
+profile_memory = False
+# Stage to profile in detail, for example 'parse_descriptions', None to only measure the stages
+profile_stage = None
+# Detailed profiler of profile_stage: 'cprofile' for the time spent by function, 'tracemalloc' for the memory allocated by line
+profile_tool = 'cprofile'
+# Folder of the detailed profiles
+profile_output_path = '../Profiles'
@@ -0,0 +1,34 @@
+import os
+import sys
+import pandas as pd
+
+# The scripts import each other by name and use paths relative to their folder
+scripts_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Scripts')
+sys.path.insert(0, scripts_directory)
+
+def test_memory_ingestion_matches_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(scripts_directory)
+    import Utils
+    from Custom import load_files, read_files, store_files
+    from Synthetic import generate_exports
+
+    file_paths = generate_exports(str(tmp_path / 'Exports'), tasks=200, sites=2)
+    # Real exports can have date and number cells, the synthetic ones only have text
+    financial_path = next(path for path in file_paths if os.path.basename(path) == 'Financial.xlsx')
+    financial = pd.read_excel(financial_path)
+    financial['Invoice Date'] = pd.to_datetime(financial['Invoice Date'], format='%m/%d/%y', errors='coerce')
+    financial['Amount'] = [None if position % 3 == 0 else position for position in range(len(financial))]
+    financial.to_excel(financial_path, index=False)
+
+    (tmp_path / 'Files').mkdir()
+    monkeypatch.setattr(Utils, 'files_directory_path', str(tmp_path / 'Files'))
+    memory_boards, memory_sites, memory_financial = load_files(file_paths, keep_snapshot=False, use_cache=False)
+    store_files(file_paths, use_cache=False)
+    csv_boards, csv_sites, csv_financial = read_files(str(tmp_path / 'Files'), use_cache=False)
+
+    # The Files folder is listed in any order
+    csv_boards_by_name = dict(zip(csv_sites, csv_boards))
+    assert sorted(memory_sites) == sorted(csv_sites)
+    for file_name, board in zip(memory_sites, memory_boards):
+        pd.testing.assert_frame_equal(board, csv_boards_by_name[file_name])
+    pd.testing.assert_frame_equal(memory_financial, csv_financial)